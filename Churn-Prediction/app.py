@@ -1,8 +1,7 @@
 import streamlit as st
 import numpy as np
-import pickle
-import tensorflow as tf
 import os
+import sys
 
 # -------------------------------------------------
 # Page config
@@ -20,63 +19,38 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "churn_final_model_deploy.h5")
 SCALER_PATH = os.path.join(BASE_DIR, "scaler.pkl")
 
+# Shared start-up code lives in the churn_serving package at the repo root
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from churn_serving import cache, models, pipeline, startup  # noqa: E402
+
 # -------------------------------------------------
 # Load model & scaler
 # -------------------------------------------------
-@st.cache_resource
-def load_model_and_scaler():
-    if not os.path.exists(MODEL_PATH):
-        st.error("❌ Model file not found. Please check deployment files.")
-        st.stop()
+if not os.path.exists(MODEL_PATH):
+    st.error("❌ Model file not found. Please check deployment files.")
+    st.stop()
 
-    if not os.path.exists(SCALER_PATH):
-        st.error("❌ Scaler file not found. Please check deployment files.")
-        st.stop()
+if not os.path.exists(SCALER_PATH):
+    st.error("❌ Scaler file not found. Please check deployment files.")
+    st.stop()
 
-    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+# TensorFlow import, model load and warm-up run in the background, once per
+# process; the first prediction waits for them if they are still running.
+startup.preload(MODEL_PATH, SCALER_PATH)
 
-    with open(SCALER_PATH, "rb") as f:
-        scaler = pickle.load(f)
 
-    return model, scaler
+@st.cache_resource
+def get_prediction_cache():
+    # Shared by all sessions; emptied when the model or scaler file changes
+    return cache.PredictionCache(pipeline.artifact_paths(MODEL_PATH, SCALER_PATH))
 
 
-model, scaler = load_model_and_scaler()
+prediction_cache = get_prediction_cache()
 
 # -------------------------------------------------
 # Feature definitions (29 features)
 # -------------------------------------------------
-FEATURES = [
-    ("Tenure", "Number of months the customer has stayed"),
-    ("PreferredLoginDevice", "Mobile = 1, Computer = 0"),
-    ("CityTier", "1 = Metro, 2 = Urban, 3 = Rural"),
-    ("WarehouseToHome", "Distance from warehouse to home (km)"),
-    ("PreferredPaymentMode", "Encoded payment mode"),
-    ("Gender", "Male = 1, Female = 0"),
-    ("HourSpendOnApp", "Average hours spent on app per day"),
-    ("NumberOfDeviceRegistered", "Total registered devices"),
-    ("PreferedOrderCat", "Encoded preferred order category"),
-    ("SatisfactionScore", "Customer satisfaction score (1–5)"),
-    ("MaritalStatus", "Married = 1, Single = 0"),
-    ("NumberOfAddress", "Number of saved addresses"),
-    ("Complain", "Complaint raised last month (1 = Yes, 0 = No)"),
-    ("OrderAmountHikeFromlastYear", "Increase in order amount (%)"),
-    ("CouponUsed", "Coupons used last month"),
-    ("OrderCount", "Orders placed last month"),
-    ("DaySinceLastOrder", "Days since last order"),
-    ("CashbackAmount", "Average cashback last month"),
-    ("Feature19", "Encoded feature"),
-    ("Feature20", "Encoded feature"),
-    ("Feature21", "Encoded feature"),
-    ("Feature22", "Encoded feature"),
-    ("Feature23", "Encoded feature"),
-    ("Feature24", "Encoded feature"),
-    ("Feature25", "Encoded feature"),
-    ("Feature26", "Encoded feature"),
-    ("Feature27", "Encoded feature"),
-    ("Feature28", "Encoded feature"),
-    ("Feature29", "Encoded feature"),
-]
+FEATURES = models.FEATURES_29
 
 # -------------------------------------------------
 # Title & description
@@ -97,9 +71,10 @@ using a **TensorFlow Neural Network** trained on real e-commerce data.
 with st.expander("ℹ️ How to use this app"):
     st.markdown("""
     1. Enter customer details below  
-    2. Adjust the churn decision threshold  
-    3. Click **Predict Churn**  
-    4. View churn probability and prediction  
+    2. Click **Predict Churn**  
+    3. View churn probability and prediction  
+    4. Adjust the churn decision threshold — the prediction updates
+       instantly without re-running the model  
 
     All values must be numeric because categorical variables
     were encoded during training.
@@ -112,17 +87,37 @@ st.divider()
 # -------------------------------------------------
 st.subheader("🔢 Customer Information")
 
-inputs = []
-cols = st.columns(2)
+# Inputs live in a form so edits are sent in one rerun on submit,
+# not one rerun per keystroke
+with st.form("customer_form"):
+    inputs = []
+    cols = st.columns(2)
+
+    for i, (name, desc) in enumerate(FEATURES):
+        with cols[i % 2]:
+            val = st.number_input(
+                label=name,
+                help=desc,
+                value=0.0
+            )
+            inputs.append(val)
 
-for i, (name, desc) in enumerate(FEATURES):
-    with cols[i % 2]:
-        val = st.number_input(
-            label=name,
-            help=desc,
-            value=0.0
-        )
-        inputs.append(val)
+    submitted = st.form_submit_button("🚀 Predict Churn")
+
+# -------------------------------------------------
+# Prediction
+# -------------------------------------------------
+def predict_proba(X):
+    with st.spinner("Loading model..."):
+        warm = startup.get(MODEL_PATH, SCALER_PATH)
+    X_scaled = warm.scaler.transform(X)
+    return float(warm.model.predict(X_scaled, verbose=0)[0][0])
+
+
+if submitted:
+    X = np.array(inputs).reshape(1, -1)
+    # Kept per session: moving the threshold below only re-runs the comparison
+    st.session_state["last_prob"] = prediction_cache.get_or_compute(X, predict_proba)
 
 st.divider()
 
@@ -145,14 +140,11 @@ st.caption(
 )
 
 # -------------------------------------------------
-# Prediction
+# Result
 # -------------------------------------------------
-if st.button("🚀 Predict Churn"):
-    X = np.array(inputs).reshape(1, -1)
-    X_scaled = scaler.transform(X)
-
-    prob = model.predict(X_scaled)[0][0]
+prob = st.session_state.get("last_prob")
 
+if prob is not None:
     st.divider()
     st.subheader("📊 Prediction Result")
 
@@ -172,3 +164,7 @@ st.caption(
     "Metric: ROC–AUC | "
     "Deployment: Streamlit Cloud"
 )
+
+if startup.is_ready(MODEL_PATH, SCALER_PATH):
+    st.caption(f"Model start-up: {startup.get(MODEL_PATH, SCALER_PATH).describe()}")
+st.caption(f"Prediction cache: {prediction_cache.describe()}")
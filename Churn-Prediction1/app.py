@@ -3,11 +3,11 @@
 # =====================================================
 
 import os
+import sys
+import tempfile
 import streamlit as st
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-import pickle
 
 # =====================================================
 # PAGE CONFIG
@@ -23,34 +23,75 @@ st.set_page_config(
 # =====================================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-MODEL_PATH = os.path.join(BASE_DIR, "churn_model_business.h5")
-SCALER_PATH = os.path.join(BASE_DIR, "scaler_business.pkl")
+# Shared scoring code lives in the churn_serving package at the repo root
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from churn_serving import autotune, cache, parallel, pipeline, startup  # noqa: E402
+
+MODEL_PATH = pipeline.MODEL_PATH
+SCALER_PATH = pipeline.SCALER_PATH
+
+# Rows shown in the on-page preview of bulk results
+BULK_PREVIEW_ROWS = 1_000
+# Processes used to score bulk uploads
+BULK_WORKERS = os.cpu_count() or 1
+# The worker pool runs $CHURN_ENGINE if set, else the NumPy engine with shared
+# weights; one worker scores in-process with the preloaded model
+BULK_ENGINE = parallel.pool_engine(MODEL_PATH) if BULK_WORKERS > 1 else None
 
 # =====================================================
 # LOAD MODEL & SCALER
 # =====================================================
-@st.cache_resource
+# TensorFlow import, model load and warm-up run in the background, once per
+# process; the first prediction waits for them if they are still running.
+startup.preload(MODEL_PATH, SCALER_PATH)
+
+
 def load_model_and_scaler():
-    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-    with open(SCALER_PATH, "rb") as f:
-        scaler = pickle.load(f)
-    return model, scaler
+    with st.spinner("Loading model..."):
+        warm = startup.get(MODEL_PATH, SCALER_PATH)
+    return warm.model, warm.scaler
+
+
+@st.cache_resource
+def get_prediction_cache():
+    # Shared by all sessions; emptied when the model or scaler file changes
+    return cache.PredictionCache(pipeline.artifact_paths(MODEL_PATH, SCALER_PATH))
+
+
+prediction_cache = get_prediction_cache()
+
+
+@st.cache_resource
+def get_bulk_cache():
+    # Shared by all sessions; keeps the last few scored uploads
+    return cache.BulkResultCache()
+
+
+bulk_cache = get_bulk_cache()
 
-model, scaler = load_model_and_scaler()
+
+@st.cache_resource
+def get_bulk_model():
+    # One worker pool per process, started on the first bulk upload; each
+    # worker scores whole chunks of the upload
+    return parallel.ParallelScorer.for_model(MODEL_PATH, SCALER_PATH, BULK_ENGINE,
+                                             workers=BULK_WORKERS)
+
+
+@st.cache_resource
+def get_bulk_chunk_rows():
+    # Probed once per model and host, then read back from the tuning file.
+    # The pool keeps up to CHUNKS_PER_WORKER chunks per worker in flight, so
+    # each gets that share of the memory budget (as in cli.score_file).
+    budget_mb = None
+    if BULK_WORKERS > 1:
+        budget_mb = autotune.memory_budget_mb() / (parallel.CHUNKS_PER_WORKER * BULK_WORKERS)
+    return autotune.tuned_chunk_rows(MODEL_PATH, SCALER_PATH, BULK_ENGINE, budget_mb=budget_mb)
 
 # =====================================================
 # FEATURE DEFINITIONS (8 BUSINESS FEATURES)
 # =====================================================
-FEATURES = [
-    "Tenure",
-    "SatisfactionScore",
-    "Complain",
-    "DaySinceLastOrder",
-    "OrderCount",
-    "CashbackAmount",
-    "HourSpendOnApp",
-    "NumberOfDeviceRegistered"
-]
+FEATURES = pipeline.FEATURES
 
 FEATURE_HELP = {
     "Tenure": "Number of months the customer has been with the company",
@@ -123,6 +164,12 @@ st.caption("Higher threshold → fewer false alarms (higher precision)")
 # =====================================================
 st.divider()
 
+def predict_single(input_data):
+    model, scaler = load_model_and_scaler()
+    input_scaled = scaler.transform(input_data)
+    return float(pipeline.predict_proba(model, input_scaled)[0])
+
+
 if st.button("🚀 Predict Churn", use_container_width=True):
 
     input_data = np.array([[
@@ -136,8 +183,7 @@ if st.button("🚀 Predict Churn", use_container_width=True):
         devices
     ]])
 
-    input_scaled = scaler.transform(input_data)
-    prob = float(model.predict(input_scaled)[0][0])
+    prob = prediction_cache.get_or_compute(input_data, predict_single)
 
     st.subheader("📊 Prediction Result")
     st.metric("Churn Probability", f"{prob * 100:.2f}%")
@@ -166,37 +212,96 @@ OrderCount, CashbackAmount, HourSpendOnApp, NumberOfDeviceRegistered`
 uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
 
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    # 🔒 Column validation (header only, the body is streamed below)
+    header = pd.read_csv(uploaded_file, nrows=0)
+    uploaded_file.seek(0)
 
-    # 🔒 Column validation
-    missing_cols = [c for c in FEATURES if c not in df.columns]
+    missing_cols = pipeline.missing_columns(header.columns)
     if missing_cols:
         st.error(f"❌ Missing required columns: {missing_cols}")
     else:
-        df_scaled = scaler.transform(df[FEATURES])
-        probs = model.predict(df_scaled).flatten()
-
-        df["Churn_Probability"] = probs
-
-        # Risk buckets
-        df["Churn_Risk"] = pd.cut(
-            probs,
-            bins=[0, 0.25, 0.5, 1.0],
-            labels=["Low", "Medium", "High"]
+        # Scored probabilities are cached per (upload contents, model version),
+        # so widget changes only re-bucket them instead of re-scoring the file
+        key = bulk_cache.key(
+            pipeline.content_hash(uploaded_file),
+            pipeline.artifact_paths(MODEL_PATH, SCALER_PATH, BULK_ENGINE),
+        )
+        result = bulk_cache.get(key)
+
+        if result is None:
+            if BULK_WORKERS > 1:
+                model = get_bulk_model()
+                scaler = model.scaler
+            else:
+                model, scaler = load_model_and_scaler()
+            progress = st.progress(0.0, text="Scoring customers...")
+
+            def report_progress(rows_done):
+                # Fraction of the upload consumed so far, by bytes read
+                done = min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+                progress.progress(done, text=f"Scored {rows_done:,} customers...")
+
+            out_file = tempfile.NamedTemporaryFile(
+                prefix="churn_predictions_", suffix=".csv", delete=False
+            )
+            out_file.close()
+
+            rows_done, _, preview, probs, imputed, dedup, unknown = pipeline.score_csv_in_chunks(
+                model, scaler, uploaded_file, out_file.name,
+                chunk_rows=get_bulk_chunk_rows(),
+                on_chunk=report_progress, preview_rows=BULK_PREVIEW_ROWS
+            )
+            progress.progress(1.0, text=f"Scored {rows_done:,} customers")
+
+            result = cache.BulkResult(
+                rows_done, probs, out_file.name, preview, imputed, dedup, unknown
+            )
+            bulk_cache.put(key, result)
+
+        st.success(f"✅ Bulk prediction completed for {result.rows:,} customers")
+
+        if result.imputed:
+            filled = ", ".join(f"{name}: {count:,}" for name, count in result.imputed.items())
+            st.info(f"ℹ️ Blank values were filled with training medians ({filled})")
+        if result.unknown:
+            levels = ", ".join(f"{name}: {count:,}" for name, count in result.unknown.items())
+            st.warning(f"⚠️ Unknown categories were scored as the baseline level ({levels})")
+        if result.dedup.get("scored", result.rows) < result.rows:
+            st.caption(
+                f"{result.dedup['scored']:,} distinct customer profiles scored "
+                f"(dedup ratio {pipeline.dedup_ratio(result.dedup):.1f}x)"
+            )
+
+        risk_counts = pipeline.risk_counts_from_probs(result.probs)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("🟢 Low risk", f"{risk_counts['Low']:,}")
+        c2.metric("🟡 Medium risk", f"{risk_counts['Medium']:,}")
+        c3.metric("🔴 High risk", f"{risk_counts['High']:,}")
+
+        above = int(np.count_nonzero(result.probs >= threshold))
+        st.caption(
+            f"{above:,} customers ({above / max(result.rows, 1):.1%}) are at or above "
+            f"the {threshold:.2f} decision threshold"
         )
 
-        st.success("✅ Bulk prediction completed")
-        st.dataframe(df)
+        if result.preview is not None:
+            st.caption(f"Showing the first {len(result.preview):,} scored rows")
+            st.dataframe(result.preview)
 
-        st.download_button(
-            "⬇️ Download Prediction Results",
-            data=df.to_csv(index=False),
-            file_name="churn_predictions.csv",
-            mime="text/csv"
-        )
+        with open(result.out_path, "rb") as f:
+            st.download_button(
+                "⬇️ Download Prediction Results",
+                data=f,
+                file_name="churn_predictions.csv",
+                mime="text/csv"
+            )
 
 # =====================================================
 # FOOTER
 # =====================================================
 st.divider()
 st.caption("© 2025 | Customer Churn Prediction | Neural Network (TensorFlow + Streamlit)")
+
+if startup.is_ready(MODEL_PATH, SCALER_PATH):
+    st.caption(f"Model start-up: {startup.get(MODEL_PATH, SCALER_PATH).describe()}")
+st.caption(f"Prediction cache: {prediction_cache.describe()}")
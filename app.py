@@ -1,8 +1,9 @@
+import os
 import streamlit as st
 import numpy as np
 import pandas as pd
-import pickle
-from tensorflow.keras.models import load_model
+
+from churn_serving import startup
 
 # Page config
 st.set_page_config(
@@ -11,10 +12,12 @@ st.set_page_config(
     layout="centered"
 )
 
-# Load model & scaler
-model = load_model("churn_final_model.keras")
-with open("scaler.pkl", "rb") as f:
-    scaler = pickle.load(f)
+# Load model & scaler (in the background, once per process)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "churn_final_model.keras")
+SCALER_PATH = os.path.join(BASE_DIR, "scaler.pkl")
+
+startup.preload(MODEL_PATH, SCALER_PATH)
 
 st.title("🛒 E-Commerce Customer Churn Prediction")
 st.markdown(
@@ -35,10 +38,14 @@ with st.form("churn_form"):
 
 # -------- Prediction --------
 if submitted:
+    with st.spinner("Loading model..."):
+        warm = startup.get(MODEL_PATH, SCALER_PATH)
+    model, scaler = warm.model, warm.scaler
+
     input_data = np.array([[tenure, hours, devices, satisfaction, cashback]])
     input_scaled = scaler.transform(input_data)
 
-    prob = model.predict(input_scaled)[0][0]
+    prob = model.predict(input_scaled, verbose=0)[0][0]
 
     st.subheader("📊 Prediction Result")
     st.metric("Churn Probability", f"{prob:.2%}")
@@ -47,3 +54,6 @@ if submitted:
         st.error("⚠️ Customer is likely to CHURN")
     else:
         st.success("✅ Customer is likely to STAY")
+
+if startup.is_ready(MODEL_PATH, SCALER_PATH):
+    st.caption(f"Model start-up: {startup.get(MODEL_PATH, SCALER_PATH).describe()}")
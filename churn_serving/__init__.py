@@ -0,0 +1,6 @@
+"""Shared scoring code for the churn prediction apps.
+
+The Streamlit apps and the headless tools in this package load the same
+model/scaler artifacts and run the same preprocessing, so a customer gets
+the same score whether it comes from the browser or a nightly batch job.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from churn_serving.cli import main
+
+sys.exit(main())
@@ -0,0 +1,212 @@
+"""REST/JSON prediction service for the churn models.
+
+Serves the same model/scaler artifacts as the Streamlit apps (see
+`churn_serving.models.MODELS`) with single-row and batch endpoints::
+
+    GET  /healthz                        liveness
+    GET  /readyz                         503 until every model has warmed up
+    GET  /models                         model names and their input features
+    GET  /metrics                        micro-batching counters per model
+    POST /models/{name}/predict          {"features": {"Tenure": 4, ...}}
+    POST /models/{name}/predict/batch    {"rows": [{"Tenure": 4, ...}, ...]}
+
+Run it with several worker processes (from the repository root)::
+
+    python -m churn_serving.api --workers 4 --port 8000
+
+Each worker loads and warms up its own copy of the models at start-up.
+Concurrent requests to the same model are coalesced by a
+`churn_serving.batching.MicroBatcher`; its knobs are read from the
+`CHURN_MAX_BATCH_SIZE` and `CHURN_MAX_WAIT_MS` environment variables (or the
+matching command-line flags). The inference engine comes from
+`CHURN_ENGINE` or `--engine` (see `churn_serving.backends`).
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from churn_serving import backends, batching, models, pipeline, startup
+
+# Largest number of rows accepted by the batch endpoint
+MAX_BATCH_ROWS = 10_000
+
+MAX_BATCH_SIZE = int(os.environ.get("CHURN_MAX_BATCH_SIZE", batching.MAX_BATCH_SIZE))
+MAX_WAIT_MS = float(os.environ.get("CHURN_MAX_WAIT_MS", batching.MAX_WAIT_MS))
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class PredictRequest(BaseModel):
+    features: Dict[str, float]
+
+
+class BatchPredictRequest(BaseModel):
+    rows: List[Dict[str, float]] = Field(..., min_length=1, max_length=MAX_BATCH_ROWS)
+
+
+class Prediction(BaseModel):
+    churn_probability: float
+    churn_risk: str
+
+
+class BatchPrediction(BaseModel):
+    predictions: List[Prediction]
+
+
+def _spec_or_404(name):
+    try:
+        return models.get_spec(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+
+
+def _to_matrix(spec, rows):
+    """Validate rows against the model's features and stack them in `spec.features` order.
+
+    For the 29-input models those are the scaler's columns: the numeric
+    inputs and the one-hot columns such as ``Gender_Male`` (see
+    `models.FEATURES_29`).
+    """
+    expected = set(spec.features)
+    for i, row in enumerate(rows):
+        missing = [f for f in spec.features if f not in row]
+        unknown = sorted(set(row) - expected)
+        if missing or unknown:
+            raise HTTPException(
+                status_code=422,
+                detail={"row": i, "missing": missing, "unknown": unknown},
+            )
+    return np.array([[row[f] for f in spec.features] for row in rows], dtype=np.float64)
+
+
+def _predict_fn(spec):
+    def predict(X):
+        warm = startup.get(spec.model_path, spec.scaler_path)
+        # By column name, so the scaler's own layout decides the order
+        df = pd.DataFrame(X, columns=spec.features)
+        return pipeline.predict_proba(warm.model, pipeline.scale(warm.scaler, df))
+    return predict
+
+
+def _batcher(spec):
+    with _batchers_lock:
+        batcher = _batchers.get(spec.name)
+        if batcher is None:
+            batcher = batching.MicroBatcher(
+                _predict_fn(spec),
+                max_batch_size=MAX_BATCH_SIZE,
+                max_wait_ms=MAX_WAIT_MS,
+                name=f"batcher-{spec.name}",
+            )
+            _batchers[spec.name] = batcher
+    return batcher
+
+
+async def _predict(spec, X):
+    probs = await asyncio.wrap_future(_batcher(spec).submit(X))
+    risks = pipeline.bucket_risk(probs)
+    return [
+        Prediction(churn_probability=float(p), churn_risk=str(r))
+        for p, r in zip(probs, risks)
+    ]
+
+
+def _preload_all():
+    for spec in models.MODELS.values():
+        startup.preload(spec.model_path, spec.scaler_path)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    _preload_all()
+    yield
+
+
+app = FastAPI(title="Churn prediction service", lifespan=lifespan)
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    pending = [
+        spec.name for spec in models.MODELS.values()
+        if not startup.is_ready(spec.model_path, spec.scaler_path)
+    ]
+    if pending:
+        return JSONResponse(status_code=503, content={"status": "loading", "pending": pending})
+    return {"status": "ready"}
+
+
+@app.get("/models")
+async def list_models():
+    return {
+        name: {"features": spec.features, "engine": backends.resolve_engine(spec.model_path)}
+        for name, spec in models.MODELS.items()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {name: batcher.metrics() for name, batcher in batchers.items()}
+
+
+@app.post("/models/{name}/predict", response_model=Prediction)
+async def predict(name: str, request: PredictRequest):
+    spec = _spec_or_404(name)
+    X = _to_matrix(spec, [request.features])
+    return (await _predict(spec, X))[0]
+
+
+@app.post("/models/{name}/predict/batch", response_model=BatchPrediction)
+async def predict_batch(name: str, request: BatchPredictRequest):
+    spec = _spec_or_404(name)
+    X = _to_matrix(spec, request.rows)
+    return BatchPrediction(predictions=await _predict(spec, X))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.api",
+        description="Serve the churn models over HTTP.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help=f"rows per coalesced predict call (default: {MAX_BATCH_SIZE})")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help=f"how long to wait for more rows (default: {MAX_WAIT_MS})")
+    parser.add_argument("--engine", choices=backends.ENGINES,
+                        help="inference engine (default: $CHURN_ENGINE or keras)")
+    args = parser.parse_args(argv)
+
+    # Worker processes re-import this module, so pass the knobs via the environment
+    os.environ["CHURN_MAX_BATCH_SIZE"] = str(args.max_batch_size)
+    os.environ["CHURN_MAX_WAIT_MS"] = str(args.max_wait_ms)
+    if args.engine:
+        os.environ[backends.ENGINE_ENV] = args.engine
+
+    import uvicorn
+
+    uvicorn.run("churn_serving.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Batch-size auto-tuning for bulk scoring.
+
+How many rows to scale and predict per call is a trade-off: small batches
+are dominated by per-call overhead (Keras `predict` in particular), very large
+ones fall out of the CPU caches and cost memory. `probe` times scaler +
+model at doubling batch sizes, stopping at a memory budget or once
+throughput stops improving, and `pick` takes the smallest size within a few
+percent of the best. `tuned_chunk_rows` does this once per (model artifact,
+scaler, engine, host, budget) and remembers the answer in a small JSON file,
+so bulk scoring (the CLI and the Churn-Prediction1 upload) just looks it up.
+
+Tune (or re-tune) from the command line (from the repository root)::
+
+    python -m churn_serving.autotune --models business --engines keras numpy
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, cache, pipeline, preprocessing, startup
+
+logger = logging.getLogger(__name__)
+
+TUNING_FILE_ENV = "CHURN_TUNING_FILE"
+TUNING_FILE = os.path.join(os.path.expanduser("~"), ".cache", "churn_serving", "tuning.json")
+MEMORY_BUDGET_ENV = "CHURN_BATCH_MEMORY_MB"
+MEMORY_BUDGET_MB = 256
+
+MIN_ROWS = 1_024
+MAX_ROWS = 1 << 20
+# Bytes per row besides the model inputs and activations: the other CSV
+# columns a chunk carries along and the scored output
+ROW_OVERHEAD_BYTES = 1_024
+# Sizes within this fraction of the best throughput count as equally fast
+TOLERANCE = 0.05
+# Stop probing after this many doublings without a new best
+PATIENCE = 2
+REPEATS = 3
+
+_lock = threading.Lock()
+
+
+def tuning_file():
+    return os.environ.get(TUNING_FILE_ENV) or TUNING_FILE
+
+
+def memory_budget_mb():
+    return float(os.environ.get(MEMORY_BUDGET_ENV) or MEMORY_BUDGET_MB)
+
+
+def host_id():
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}"
+
+
+def row_bytes(model_path, n_features):
+    """Estimated peak bytes per row in flight: raw + scaled inputs, activations."""
+    try:
+        widths = [kernel.shape[1] for kernel, _, _, _ in backends.reference(model_path).layers]
+    except (OSError, KeyError, ValueError):
+        widths = [n_features]
+    return n_features * (8 + 4) + 4 * sum(widths) + ROW_OVERHEAD_BYTES
+
+
+def _sample(scaler, rows, seed=0):
+    # Raw-valued rows; timing does not depend on the values themselves
+    fused = (
+        scaler if isinstance(scaler, preprocessing.FusedScaler)
+        else preprocessing.FusedScaler.from_sklearn(scaler)
+    )
+    X = fused.inverse_transform(np.random.default_rng(seed).normal(size=(rows, fused.n_features_in_)))
+    return pd.DataFrame(X.astype(np.float64), columns=fused.feature_names_in_)
+
+
+def _time_batch(model, scaler, df):
+    buffer = pipeline.scaling_buffer(scaler, len(df))
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        if isinstance(scaler, preprocessing.FusedScaler):
+            X = scaler.transform(df, out=buffer)
+        else:
+            X = scaler.transform(df)
+        pipeline.predict_proba(model, X)
+        best = min(best, time.perf_counter() - start)
+    return len(df) / best
+
+
+def probe(model, scaler, max_rows, min_rows=MIN_ROWS):
+    """Rows/s of scaler + model at doubling batch sizes up to `max_rows`.
+
+    Returns [(rows, rows_per_s), ...] in probing order.
+    """
+    df = _sample(scaler, max(min_rows, max_rows))
+    _time_batch(model, scaler, df.iloc[:min_rows])  # warm-up
+    results = []
+    best, since_best = 0.0, 0
+    rows = min_rows
+    while rows <= max_rows and since_best < PATIENCE:
+        rate = _time_batch(model, scaler, df.iloc[:rows])
+        results.append((rows, rate))
+        if rate > best * (1 + TOLERANCE):
+            best, since_best = rate, 0
+        else:
+            since_best += 1
+        rows *= 2
+    return results
+
+
+def pick(results):
+    """Smallest probed size within TOLERANCE of the best throughput."""
+    best = max(rate for _, rate in results)
+    return min(rows for rows, rate in results if rate >= best * (1 - TOLERANCE))
+
+
+def _load_entries(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_entry(path, key, entry):
+    with _lock:
+        entries = _load_entries(path)
+        entries[key] = entry
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def tuning_key(model_path, scaler_path, engine, budget_mb):
+    fingerprint = cache.artifact_fingerprint(
+        [backends.artifact_path(model_path, engine), scaler_path]
+    )
+    return f"{engine}|{fingerprint}|{host_id()}|{budget_mb:g}MB"
+
+
+def tune(model_path, scaler_path, engine=None, budget_mb=None):
+    """Probe and persist the best chunk size; returns the stored entry."""
+    engine = backends.resolve_engine(model_path, engine)
+    budget_mb = memory_budget_mb() if budget_mb is None else budget_mb
+    warm = startup.get(model_path, scaler_path, engine=engine)
+    per_row = row_bytes(model_path, warm.scaler.n_features_in_)
+    max_rows = max(MIN_ROWS, min(MAX_ROWS, int(budget_mb * 1024 * 1024 / per_row)))
+
+    results = probe(warm.model, warm.scaler, max_rows)
+    entry = {
+        "chunk_rows": pick(results),
+        "rows_per_s": {str(rows): round(rate) for rows, rate in results},
+        "model": os.path.abspath(model_path),
+        "engine": engine,
+        "host": host_id(),
+        "budget_mb": budget_mb,
+        "tuned": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    _save_entry(tuning_file(), tuning_key(model_path, scaler_path, engine, budget_mb), entry)
+    logger.info("%s (%s): %d rows per chunk", os.path.basename(model_path), engine,
+                entry["chunk_rows"])
+    return entry
+
+
+def tuned_chunk_rows(model_path, scaler_path, engine=None, budget_mb=None,
+                     default=pipeline.CHUNK_ROWS):
+    """The persisted best chunk size for this model/host, tuning it on first use.
+
+    Falls back to `default` if the model cannot be loaded for tuning.
+    """
+    try:
+        engine = backends.resolve_engine(model_path, engine)
+        budget_mb = memory_budget_mb() if budget_mb is None else budget_mb
+        key = tuning_key(model_path, scaler_path, engine, budget_mb)
+        entry = _load_entries(tuning_file()).get(key)
+        if entry is None:
+            entry = tune(model_path, scaler_path, engine, budget_mb)
+        return entry["chunk_rows"]
+    except (OSError, ImportError) as exc:
+        logger.warning("Batch size tuning failed (%s); using %d rows per chunk", exc, default)
+        return default
+
+
+def main(argv=None):
+    from churn_serving import models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.autotune",
+        description="Find and store the fastest bulk-scoring batch size per model and host.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--engines", nargs="+", default=[backends.DEFAULT_ENGINE],
+                        choices=backends.ENGINES)
+    parser.add_argument("--budget-mb", type=float, default=memory_budget_mb(),
+                        help="memory budget for one batch in flight (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    for name in args.models:
+        spec = models.get_spec(name)
+        for engine in args.engines:
+            entry = tune(spec.model_path, spec.scaler_path, engine, args.budget_mb)
+            rates = ", ".join(f"{int(rows):,}: {rate:,}/s" for rows, rate in entry["rows_per_s"].items())
+            print(f"{name} / {engine}: {entry['chunk_rows']:,} rows per chunk ({rates})")
+    print(f"stored in {tuning_file()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
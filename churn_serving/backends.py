@@ -0,0 +1,543 @@
+"""Interchangeable inference engines for the churn models.
+
+Every engine is loaded through `load` and exposes the Keras-style
+`predict(X, batch_size=None, verbose=0)` that the scoring code already calls,
+returning float32 probabilities of shape (rows, 1). Which engine runs is a
+deployment setting, not an app change: it is read from the `CHURN_ENGINE`
+environment variable (or passed explicitly), and
+
+* ``keras``        - `model.predict` on the Keras .h5 / .keras file
+* ``keras-call``   - direct `model(x, training=False)` calls, which skip
+  predict's per-call setup for the tiny batches of the app forms
+* ``tf-function``  - a `tf.function` traced once for a fixed input signature
+* ``tf-bucketed``  - one `tf.function` per power-of-two batch size, all traced
+  at load; requests are zero-padded up to the next bucket
+* ``numpy``        - the TensorFlow-free `.npz` of `churn_serving.numpy_engine`
+* ``numpy-folded`` - the same with the scaler folded into the first layer
+  (`.folded.npz` from `churn_serving.fold_scaler`)
+* ``numpy-sparse`` - the `.folded.npz` with each one-hot group taken as one
+  level code and gathered from the first-layer kernel
+  (`churn_serving.sparse_input`); for bulk scoring of raw categorical columns
+* ``onnx``         - ONNX Runtime on the `.onnx` written by
+  `churn_serving.onnx_export`, which has the scaler built in
+* ``tflite``       - the TFLite interpreter on the int8 `.tflite` written by
+  `churn_serving.tflite_export`
+
+Each engine can be checked against a NumPy reference built from the same
+weights; set `CHURN_ENGINE_CHECK=1` to do so on every load, or compare all of
+them from the command line (from the repository root)::
+
+    python -m churn_serving.backends --models business --engines keras numpy tf-function
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from churn_serving import numpy_engine
+
+ENGINES = (
+    "keras", "keras-call", "tf-function", "tf-bucketed",
+    "numpy", "numpy-folded", "numpy-sparse", "onnx", "tflite",
+)
+DEFAULT_ENGINE = "keras"
+ENGINE_ENV = "CHURN_ENGINE"
+CHECK_ENV = "CHURN_ENGINE_CHECK"
+
+# Engines that run TensorFlow itself on the Keras model file
+TF_ENGINES = ("keras", "keras-call", "tf-function", "tf-bucketed")
+# File each of the other engines loads, next to the Keras model file
+# (longer suffixes first, so that a `.folded.npz` is not taken for a `.npz`)
+ARTIFACT_SUFFIXES = {
+    "numpy-folded": ".folded.npz",
+    "numpy-sparse": ".folded.npz",
+    "numpy": ".npz",
+    "onnx": ".onnx",
+    "tflite": ".tflite",
+}
+KERAS_SUFFIXES = (".h5", ".keras")
+
+# keras-call hands larger batches to predict, which splits them into batches
+DIRECT_CALL_MAX_ROWS = 1_024
+# tf-bucketed traces batch sizes 1, 2, 4, ... up to this; larger inputs are
+# run in slices of this size
+MAX_BUCKET_ROWS = 1_024
+# ONNX Runtime intra-op threads; the MLPs are too small to profit from more
+ORT_THREADS_ENV = "CHURN_ORT_THREADS"
+ORT_THREADS = 1
+
+# Largest allowed |engine - reference| difference in the equivalence check
+ATOL = 1e-5
+# int8-quantized models clip inputs outside their calibrated range, so they
+# are held to a mean rather than a max difference
+QUANTIZED_ATOL = 0.02
+CHECK_ROWS = 1_024
+
+
+def resolve_engine(model_path, engine=None):
+    """The engine to load `model_path` with.
+
+    An explicit `engine` wins; otherwise an engine-specific file (`.npz`,
+    `.onnx`, ...) picks its own engine, and Keras files use the
+    `CHURN_ENGINE` environment variable (default ``keras``).
+    """
+    if engine is None:
+        for name, engine_suffix in ARTIFACT_SUFFIXES.items():
+            if model_path.endswith(engine_suffix):
+                return name
+        engine = os.environ.get(ENGINE_ENV) or DEFAULT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+    return engine
+
+
+def _stem(model_path):
+    for suffix in ARTIFACT_SUFFIXES.values():
+        if model_path.endswith(suffix):
+            return model_path[:-len(suffix)]
+    return os.path.splitext(model_path)[0]
+
+
+def artifact_path(model_path, engine):
+    """The file `engine` loads for the model at `model_path`."""
+    suffix = ARTIFACT_SUFFIXES.get(engine)
+    if suffix is None:
+        return model_path
+    return _stem(model_path) + suffix
+
+
+def checks_enabled():
+    return os.environ.get(CHECK_ENV, "").lower() in ("1", "true", "yes")
+
+
+# -------------------------------------------------
+# Engines
+# -------------------------------------------------
+def _load_keras(path):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(path, compile=False)
+
+
+class Backend:
+    """Defaults shared by the engines below."""
+
+    engine = None
+    # Set by engines whose artifact applies the scaler itself; the model then
+    # takes raw features and this FusedScaler says which ones
+    folded_scaler = None
+    quantized = False
+    atol = ATOL
+
+    def check_inputs(self, X, rng):
+        """Scaled reference inputs `X` -> (reference inputs, this engine's inputs)."""
+        if self.folded_scaler is not None:
+            return X, self.folded_scaler.inverse_transform(X)
+        return X, X
+
+
+class KerasBackend(Backend):
+    """`model.predict` on a Keras model."""
+
+    engine = "keras"
+
+    def __init__(self, path):
+        self.path = path
+        self.model = _load_keras(path)
+
+    @property
+    def input_dim(self):
+        return int(self.model.input_shape[-1])
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return self.model.predict(X, batch_size=batch_size, verbose=verbose)
+
+
+class KerasCallBackend(KerasBackend):
+    """Direct `model(x, training=False)` calls for small batches."""
+
+    engine = "keras-call"
+
+    def predict(self, X, batch_size=None, verbose=0):
+        if len(X) > DIRECT_CALL_MAX_ROWS:
+            return super().predict(X, batch_size=batch_size, verbose=verbose)
+        return np.asarray(self.model(np.asarray(X, dtype=np.float32), training=False))
+
+
+class TFFunctionBackend(KerasBackend):
+    """The model traced once as a `tf.function` over (None, input_dim) float32."""
+
+    engine = "tf-function"
+
+    def __init__(self, path):
+        super().__init__(path)
+        import tensorflow as tf
+
+        model = self.model
+        signature = [tf.TensorSpec([None, self.input_dim], tf.float32)]
+        # A concrete function never retraces, whatever the batch size
+        self._fn = tf.function(
+            lambda x: model(x, training=False), input_signature=signature
+        ).get_concrete_function()
+        self._tf = tf
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return self._fn(self._tf.constant(X, dtype=self._tf.float32)).numpy()
+
+
+def bucket_sizes(max_rows=MAX_BUCKET_ROWS):
+    """Powers of two from 1 up to and including `max_rows` (itself a power of two)."""
+    return [1 << i for i in range(max_rows.bit_length()) if 1 << i <= max_rows]
+
+
+class TFBucketedBackend(KerasBackend):
+    """Fixed-shape `tf.function`s for power-of-two batch sizes.
+
+    Every bucket is traced when the engine loads, so no request ever meets a
+    batch size TensorFlow has not seen; inputs are zero-padded to the next
+    bucket and the padding rows are dropped from the output.
+    """
+
+    engine = "tf-bucketed"
+
+    def __init__(self, path, max_rows=MAX_BUCKET_ROWS):
+        super().__init__(path)
+        import tensorflow as tf
+
+        model = self.model
+        fn = tf.function(lambda x: model(x, training=False))
+        self.buckets = bucket_sizes(max_rows)
+        self._fns = {
+            rows: fn.get_concrete_function(tf.TensorSpec([rows, self.input_dim], tf.float32))
+            for rows in self.buckets
+        }
+        self._tf = tf
+        # The first call of a concrete function still pays for instantiating
+        # its graph, so make that call here rather than on a request
+        for rows, bucket_fn in self._fns.items():
+            bucket_fn(tf.zeros([rows, self.input_dim], tf.float32))
+
+    def _bucket(self, rows):
+        return 1 << max(rows - 1, 0).bit_length()
+
+    def _predict_padded(self, X):
+        rows = len(X)
+        bucket = self._bucket(rows)
+        if bucket != rows:
+            padded = np.zeros((bucket, self.input_dim), dtype=np.float32)
+            padded[:rows] = X
+            X = padded
+        return self._fns[bucket](self._tf.constant(X)).numpy()[:rows]
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        step = self.buckets[-1]
+        if len(X) <= step:
+            return self._predict_padded(X)
+        return np.concatenate([
+            self._predict_padded(X[start:start + step]) for start in range(0, len(X), step)
+        ])
+
+
+class NumpyBackend(Backend):
+    """`churn_serving.numpy_engine.NumpyMLP` on an exported `.npz`."""
+
+    engine = "numpy"
+
+    def __init__(self, path):
+        self.path = path
+        self.model = numpy_engine.load(path)
+        if self.model.input_scaler is not None:
+            from churn_serving import preprocessing
+
+            self.engine = "numpy-folded"
+            self.folded_scaler = preprocessing.FusedScaler.from_config(self.model.input_scaler)
+
+    @property
+    def input_dim(self):
+        return self.model.input_dim
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return self.model.predict(X)
+
+
+class NumpySparseBackend(Backend):
+    """`churn_serving.sparse_input.SparseInputMLP` on the `.folded.npz`.
+
+    Its inputs are the raw numeric features followed by one level code per
+    categorical column, as described by `folded_scaler`'s `categories_`.
+    """
+
+    engine = "numpy-sparse"
+
+    def __init__(self, path):
+        from churn_serving import preprocessing, sparse_input
+
+        self.path = path
+        folded = numpy_engine.load(path)
+        self.model = sparse_input.SparseInputMLP(folded)
+        self._dense_scaler = preprocessing.FusedScaler.from_config(folded.input_scaler)
+        self.folded_scaler = preprocessing.FusedScaler.identity(
+            self.model.input_names, categories=self.model.categories
+        )
+
+    @property
+    def input_dim(self):
+        return self.model.input_dim
+
+    def predict(self, X, batch_size=None, verbose=0):
+        return self.model.predict(X)
+
+    def check_inputs(self, X, rng):
+        # Only valid one-hot rows have a sparse equivalent
+        raw = self.model.random_dense(self._dense_scaler.inverse_transform(X), rng)
+        return self._dense_scaler.transform(raw), self.model.from_dense(raw)
+
+
+def _ort_session_options(ort, threads):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    # Idle pool threads sleep instead of spinning, so a serving process with
+    # several workers or batchers does not burn cores between requests
+    options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return options
+
+
+class OnnxBackend(Backend):
+    """ONNX Runtime on the CPU execution provider.
+
+    Models from `churn_serving.onnx_export` carry their scaler, so they take
+    raw features (see `folded_scaler`).
+    """
+
+    engine = "onnx"
+
+    def __init__(self, path, threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise ImportError("The onnx engine needs onnxruntime: pip install onnxruntime") from exc
+        from churn_serving import onnx_export, preprocessing
+
+        threads = threads or int(os.environ.get(ORT_THREADS_ENV) or ORT_THREADS)
+        self.path = path
+        self.session = ort.InferenceSession(
+            path, _ort_session_options(ort, threads), providers=["CPUExecutionProvider"]
+        )
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        config = metadata.get(onnx_export.SCALER_METADATA_KEY)
+        self.folded_scaler = (
+            preprocessing.FusedScaler.from_config(json.loads(config)) if config else None
+        )
+        inp = self.session.get_inputs()[0]
+        self._input_name = inp.name
+        self._input_dim = int(inp.shape[-1])
+
+    @property
+    def input_dim(self):
+        return self._input_dim
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        return self.session.run(None, {self._input_name: X})[0].reshape(-1, 1)
+
+
+def _tflite_interpreter(path):
+    # Prefer the standalone interpreter packages, which do not pull in TensorFlow
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path)
+
+
+class TFLiteBackend(Backend):
+    """The TFLite interpreter; quantized inputs/outputs are (de)quantized here."""
+
+    engine = "tflite"
+
+    def __init__(self, path):
+        self.path = path
+        self.interpreter = _tflite_interpreter(path)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._rows = int(self._input["shape"][0])
+        self.quantized = any(
+            t["dtype"] == np.int8 for t in self.interpreter.get_tensor_details()
+        )
+        self.atol = QUANTIZED_ATOL if self.quantized else ATOL
+
+    @property
+    def input_dim(self):
+        return int(self._input["shape"][-1])
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        # One interpreter per backend, shared by e.g. every Streamlit session
+        # thread; resizing and invoking it must not interleave
+        with self._lock:
+            return self._predict(X)
+
+    def _predict(self, X):
+        if len(X) != self._rows:
+            self.interpreter.resize_tensor_input(self._input["index"], [len(X), self.input_dim])
+            self.interpreter.allocate_tensors()
+            self._output = self.interpreter.get_output_details()[0]
+            self._rows = len(X)
+
+        scale, zero_point = self._input["quantization"]
+        if scale:
+            info = np.iinfo(self._input["dtype"])
+            X = np.clip(np.round(X / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(self._input["index"], X.astype(self._input["dtype"]))
+        self.interpreter.invoke()
+
+        out = self.interpreter.get_tensor(self._output["index"])
+        scale, zero_point = self._output["quantization"]
+        if scale:
+            out = (out.astype(np.float32) - zero_point) * scale
+        return np.asarray(out, dtype=np.float32).reshape(-1, 1)
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "keras-call": KerasCallBackend,
+    "tf-function": TFFunctionBackend,
+    "tf-bucketed": TFBucketedBackend,
+    "numpy": NumpyBackend,
+    "numpy-folded": NumpyBackend,
+    "numpy-sparse": NumpySparseBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+}
+
+
+# -------------------------------------------------
+# Loading and equivalence checks
+# -------------------------------------------------
+def reference(model_path):
+    """A NumPy forward pass over the same weights, to compare engines against."""
+    if model_path.endswith(KERAS_SUFFIXES):
+        return numpy_engine.NumpyMLP.from_keras_file(model_path)
+    return numpy_engine.load(_stem(model_path) + ".npz")
+
+
+def output_diff(backend, ref, rows=CHECK_ROWS, seed=0):
+    """|backend - ref| probability differences on random scaled inputs.
+
+    Reduced with max, or with mean for quantized backends.
+    """
+    # Scaled features are roughly standard normal
+    rng = np.random.default_rng(seed)
+    X, X_in = backend.check_inputs(rng.normal(size=(rows, ref.input_dim)).astype(np.float32), rng)
+    expected = ref.predict(X).reshape(-1)
+    diffs = np.abs(backend.predict(X_in, batch_size=rows).reshape(-1) - expected)
+    return float(diffs.mean() if backend.quantized else diffs.max())
+
+
+def check(backend, model_path, atol=None):
+    """Raise ValueError if `backend` disagrees with the reference by more than `atol`.
+
+    `atol` defaults to the backend's own tolerance (looser for int8 models).
+    """
+    atol = backend.atol if atol is None else atol
+    diff = output_diff(backend, reference(model_path))
+    if diff > atol:
+        raise ValueError(
+            f"{backend.engine} engine output differs from the reference by {diff:.2e} "
+            f"(tolerance {atol:.0e}) for {model_path}"
+        )
+    return diff
+
+
+def load(model_path, engine=None, check_outputs=None):
+    """Load `model_path` with `engine` (see `resolve_engine`).
+
+    For engines with their own artifact the sibling file is loaded, e.g.
+    ``churn_model_business.npz`` for ``churn_model_business.h5`` with the
+    numpy engine. With `check_outputs` (default: `CHURN_ENGINE_CHECK`) the
+    loaded engine is verified against the NumPy reference first.
+    """
+    engine = resolve_engine(model_path, engine)
+    path = artifact_path(model_path, engine)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {engine} model at {path}")
+    backend = BACKENDS[engine](path)
+    if checks_enabled() if check_outputs is None else check_outputs:
+        check(backend, model_path)
+    return backend
+
+
+# -------------------------------------------------
+# Command line
+# -------------------------------------------------
+def _timings(backend, input_dim, rows, iters=200):
+    rng = np.random.default_rng(1)
+    _, X = backend.check_inputs(rng.normal(size=(rows, input_dim)).astype(np.float32), rng)
+    row = X[:1]
+    backend.predict(row, batch_size=1)
+    latencies = np.empty(iters)
+    for i in range(iters):
+        start = time.perf_counter()
+        backend.predict(row, batch_size=1)
+        latencies[i] = time.perf_counter() - start
+    start = time.perf_counter()
+    backend.predict(X, batch_size=rows)
+    return 1000 * float(np.median(latencies)), rows / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    from churn_serving import models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.backends",
+        description="Check every inference engine against the NumPy reference and time it.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=ENGINES)
+    parser.add_argument("--atol", type=float, default=None,
+                        help=f"tolerance for the equivalence check (default: {ATOL}, "
+                             f"{QUANTIZED_ATOL} for int8 models)")
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="rows for the throughput measurement")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for name in args.models:
+        spec = models.get_spec(name)
+        ref = reference(spec.model_path)
+        print(f"{name} ({os.path.relpath(spec.model_path, models.ROOT_DIR)})")
+        for engine in args.engines:
+            try:
+                backend = load(spec.model_path, engine, check_outputs=False)
+            except (ImportError, FileNotFoundError) as exc:
+                print(f"  {engine:<12} unavailable: {exc}")
+                continue
+            diff = output_diff(backend, ref)
+            ok = diff <= (backend.atol if args.atol is None else args.atol)
+            status = status or (0 if ok else 1)
+            p50_ms, rows_per_s = _timings(backend, ref.input_dim, args.rows)
+            reduction = "mean" if backend.quantized else "max"
+            print(f"  {engine:<12} {reduction} diff {diff:.2e} ({'ok' if ok else 'MISMATCH'}), "
+                  f"single row p50 {p50_ms:.3f} ms, {rows_per_s:,.0f} rows/s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
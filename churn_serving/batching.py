@@ -0,0 +1,145 @@
+"""Server-side micro-batching of concurrent prediction requests.
+
+Every request used to be its own `model.predict` call on a single row, so
+under concurrent load the per-call overhead dominated. `MicroBatcher`
+coalesces rows that arrive within `max_wait_ms` of the first waiting row (or
+until `max_batch_size` rows are queued), runs one vectorized scaler + model
+call on a background thread and fans the results back out to the callers.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+
+# Defaults for the latency/throughput knobs
+MAX_BATCH_SIZE = 256
+MAX_WAIT_MS = 2.0
+
+
+class BatchStats:
+    """Counters describing how well requests are being coalesced."""
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.queue_seconds = 0.0
+        self.predict_seconds = 0.0
+
+    def as_dict(self):
+        batches = max(self.batches, 1)
+        requests = max(self.requests, 1)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "mean_batch_rows": self.rows / batches,
+            "largest_batch_rows": self.largest_batch,
+            "mean_queue_ms": 1000 * self.queue_seconds / requests,
+            "mean_predict_ms": 1000 * self.predict_seconds / batches,
+        }
+
+
+def _settle(setter, value):
+    # Resolve a caller's future; a future that is already resolved must not
+    # take the batcher thread (and every later request) down with it
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+    """Coalesce concurrent `submit` calls into batched `predict_fn` calls.
+
+    `predict_fn(X)` takes a 2-D array and returns one probability per row.
+    It is only ever called from the batcher's own thread.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 name="micro-batcher"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.stats = BatchStats()
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        """Queue the rows of `X`; returns a Future of their probabilities."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        future = Future()
+        self._queue.put((X, future, time.perf_counter()))
+        return future
+
+    def predict(self, X, timeout=None):
+        """Blocking convenience wrapper around `submit`."""
+        return self.submit(X).result(timeout)
+
+    def _collect(self):
+        # Block for the first request, then gather more until the window
+        # closes or the batch is full.
+        items = [self._queue.get()]
+        rows = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items, rows
+
+    def _loop(self):
+        while True:
+            items, rows = self._collect()
+            # Callers that gave up (e.g. a cancelled request task, through
+            # `asyncio.wrap_future`) are dropped; the rest can no longer be
+            # cancelled
+            items = [item for item in items if item[1].set_running_or_notify_cancel()]
+            if not items:
+                continue
+            rows = sum(len(x) for x, _, _ in items)
+            started = time.perf_counter()
+            try:
+                X = items[0][0] if len(items) == 1 else np.concatenate([x for x, _, _ in items])
+                probs = np.asarray(self.predict_fn(X)).reshape(-1)
+            except BaseException as exc:
+                for _, future, _ in items:
+                    _settle(future.set_exception, exc)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for x, future, _ in items:
+                _settle(future.set_result, probs[offset:offset + len(x)])
+                offset += len(x)
+
+            with self._stats_lock:
+                self.stats.requests += len(items)
+                self.stats.rows += rows
+                self.stats.batches += 1
+                self.stats.largest_batch = max(self.stats.largest_batch, rows)
+                self.stats.queue_seconds += sum(started - queued for _, _, queued in items)
+                self.stats.predict_seconds += finished - started
+
+    def metrics(self):
+        """Current knob settings and batching counters."""
+        with self._stats_lock:
+            stats = self.stats.as_dict()
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize(),
+            **stats,
+        }
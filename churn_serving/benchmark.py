@@ -0,0 +1,197 @@
+"""Benchmarks for the churn inference paths.
+
+For every deployed model (see `churn_serving.models.MODELS`) and engine
+(`keras`: the .h5/.keras model + pickled scaler the apps load; `numpy`: the
+exported .npz + .json; any other `churn_serving.backends` engine on request)
+this measures
+
+* model start-up: import, load and warm-up time,
+* single-row latency (p50 / p99) of scaling + predict, as in the app forms,
+* batch throughput in rows/s of `pipeline.score_frame` (encoding, blank
+  filling, scaling, predict) over fixed-size chunks, as the bulk paths do,
+* peak RSS of the process.
+
+Inputs are raw synthetic customers from `churn_serving.synthetic` (raw
+categorical columns and blanks included), cycled to each requested size;
+the pool is larger than a chunk, so no chunk repeats rows beyond the
+duplicates the data has anyway.
+
+Each (model, engine) case runs in a fresh process so start-up times are cold
+and peak RSS is not inherited from earlier cases. Example::
+
+    python -m churn_serving.benchmark --rows 10000 1000000 --output bench.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, models, pipeline, startup, synthetic
+
+ENGINES = ("keras", "numpy")
+ROWS = (10_000, 1_000_000, 10_000_000)
+CHUNK_ROWS = 100_000
+SINGLE_ROW_ITERS = 1_000
+# Distinct synthetic customers cycled through for the throughput runs
+SAMPLE_ROWS = 200_000
+
+
+def load_sample(rows=SAMPLE_ROWS, seed=0):
+    """Raw synthetic customers with every model's input columns, blanks included."""
+    return synthetic.generate(synthetic.build_profile(), rows, np.random.default_rng(seed))
+
+
+def replicated_chunks(sample, rows, chunk_rows):
+    """Yield `rows` rows cycling through the DataFrame `sample`, `chunk_rows` at a time."""
+    start = 0
+    while start < rows:
+        n = min(chunk_rows, rows - start)
+        idx = np.arange(start, start + n) % len(sample)
+        yield sample.take(idx).reset_index(drop=True)
+        start += n
+
+
+def artifact_paths(spec, engine):
+    if engine == "numpy":
+        return spec.numpy_model_path, spec.json_scaler_path
+    return spec.model_path, spec.scaler_path
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec, so a spawned child would report its parent's
+    # peak; the kernel's VmHWM is per address space
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(model_name, engine, rows, single_iters, chunk_rows):
+    """Benchmark one model/engine pair; meant to run in its own process."""
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    spec = models.get_spec(model_name)
+    model_path, scaler_path = artifact_paths(spec, engine)
+
+    warm = startup.get(model_path, scaler_path, engine=engine)
+    model, scaler = warm.model, warm.scaler
+    sample = load_sample(max(SAMPLE_ROWS, chunk_rows))
+
+    # Complete rows, as a form submits them
+    complete = sample.dropna()
+    rows_1 = [complete.iloc[[i % len(complete)]] for i in range(min(single_iters, len(complete)))]
+    latencies = np.empty(single_iters)
+    for i in range(single_iters):
+        row = rows_1[i % len(rows_1)]
+        start = time.perf_counter()
+        pipeline.predict_proba(model, pipeline.scale(scaler, row))
+        latencies[i] = time.perf_counter() - start
+
+    batches = []
+    buffer = pipeline.scaling_buffer(scaler, chunk_rows)
+    for n in rows:
+        start = time.perf_counter()
+        for chunk in replicated_chunks(sample, n, chunk_rows):
+            pipeline.score_frame(model, scaler, chunk, out=pipeline.buffer_rows(buffer, len(chunk)))
+        seconds = time.perf_counter() - start
+        batches.append({"rows": n, "seconds": seconds, "rows_per_s": n / seconds})
+
+    return {
+        "model": model_name,
+        "engine": engine,
+        "startup_s": warm.timings,
+        "single_row_ms": {
+            "iters": single_iters,
+            "p50": 1000 * float(np.percentile(latencies, 50)),
+            "p99": 1000 * float(np.percentile(latencies, 99)),
+        },
+        "batch": batches,
+        "peak_rss_mb": peak_rss_mb(),
+        "versions": library_versions(),
+    }
+
+
+def library_versions():
+    """Versions of the numeric libraries imported by this process."""
+    versions = {"numpy": np.__version__, "pandas": pd.__version__}
+    for name in ("tensorflow", "sklearn"):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = module.__version__
+    return versions
+
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def format_result(r):
+    startup_s = ", ".join(f"{k} {v:.2f}s" for k, v in r["startup_s"].items())
+    lines = [
+        f"{r['model']:>8} / {r['engine']:<5}  start-up: {startup_s}",
+        f"{'':>17}single row: p50 {r['single_row_ms']['p50']:.3f} ms, "
+        f"p99 {r['single_row_ms']['p99']:.3f} ms",
+    ]
+    for b in r["batch"]:
+        lines.append(f"{'':>17}{b['rows']:>12,} rows: {b['rows_per_s']:>14,.0f} rows/s")
+    lines.append(f"{'':>17}peak RSS: {r['peak_rss_mb']:.0f} MB")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.benchmark",
+        description="Benchmark the churn inference paths.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=backends.ENGINES)
+    parser.add_argument("--rows", nargs="+", type=int, default=list(ROWS),
+                        help="dataset sizes for the throughput runs")
+    parser.add_argument("--single-iters", type=int, default=SINGLE_ROW_ITERS,
+                        help="single-row predictions timed per case")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for model_name in args.models:
+        for engine in args.engines:
+            with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                result = pool.submit(
+                    run_case, model_name, engine, args.rows, args.single_iters, args.chunk_rows
+                ).result()
+            print(format_result(result), flush=True)
+            results.append(result)
+
+    if args.output:
+        report = {"environment": environment(), "results": results}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
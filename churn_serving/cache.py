@@ -0,0 +1,173 @@
+"""Prediction caches for the Streamlit apps.
+
+Streamlit reruns and repeat submissions keep asking for the same customer.
+`PredictionCache` remembers probabilities per (artifact fingerprint, feature
+vector) with LRU eviction and a TTL, and empties itself when the model or
+scaler file changes on disk. `BulkResultCache` does the same for whole
+uploads, keyed on the upload's content hash plus the artifact fingerprint.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 3600.0
+# Inputs equal to this many decimals share a cache entry
+DECIMALS = 6
+# How often to re-stat the artifacts for changes
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+def artifact_fingerprint(paths):
+    """Cheap fingerprint of files: path, size and modification time of each."""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def canonical_key(row, decimals=DECIMALS):
+    """Hash a raw feature vector so that near-identical inputs collide."""
+    x = np.round(np.asarray(row, dtype=np.float64).reshape(-1), decimals)
+    x += 0.0  # folds -0.0 into 0.0
+    return hashlib.blake2b(x.tobytes(), digest_size=16).digest()
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache of churn probabilities for one model/scaler."""
+
+    def __init__(self, artifact_paths, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS,
+                 decimals=DECIMALS):
+        self.artifact_paths = list(artifact_paths)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = artifact_fingerprint(self.artifact_paths)
+        self._checked_at = time.monotonic()
+
+    def _check_artifacts(self, now):
+        if now - self._checked_at < CHECK_INTERVAL_SECONDS:
+            return
+        self._checked_at = now
+        fingerprint = artifact_fingerprint(self.artifact_paths)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._entries.clear()
+            self.invalidations += 1
+
+    @property
+    def fingerprint(self):
+        return self._fingerprint
+
+    def get(self, row):
+        """Cached probability for `row`, or None."""
+        key = canonical_key(row, self.decimals)
+        now = time.monotonic()
+        with self._lock:
+            self._check_artifacts(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, row, prob):
+        key = canonical_key(row, self.decimals)
+        with self._lock:
+            self._entries[key] = (prob, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, row, compute):
+        """Return the cached probability for `row`, calling `compute(row)` on a miss."""
+        prob = self.get(row)
+        if prob is None:
+            prob = compute(row)
+            self.put(row, prob)
+        return prob
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def describe(self):
+        s = self.stats()
+        return f"{s['hits']} hits / {s['misses']} misses, {s['entries']} cached"
+
+
+class BulkResult:
+    """Scored probabilities of one upload plus the files derived from them."""
+
+    def __init__(self, rows, probs, out_path, preview, imputed=None, dedup=None, unknown=None):
+        self.rows = rows
+        self.probs = probs
+        self.out_path = out_path
+        self.preview = preview
+        # Blank values filled per column while scoring
+        self.imputed = imputed or {}
+        # Rows vs. distinct rows run through the model (pipeline.predict_unique)
+        self.dedup = dedup or {}
+        # Categorical values per column that are not a training level
+        self.unknown = unknown or {}
+
+
+class BulkResultCache:
+    """Small LRU of BulkResults; evicted results have their output file removed."""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash, artifact_paths):
+        return content_hash, artifact_fingerprint(artifact_paths)
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None and os.path.exists(result.out_path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                try:
+                    os.remove(evicted.out_path)
+                except OSError:
+                    pass
@@ -0,0 +1,267 @@
+"""Headless batch scoring, by default with the business churn model.
+
+Example (from the repository root)::
+
+    python -m churn_serving customers.csv -o scored.csv --workers 8
+
+Any of the deployed models can be used with ``--model``/``--scaler``; for the
+29-input models raw exports such as `scoring_web.csv` work as they are, since
+their categorical columns are one-hot encoded on the fly (see
+`preprocessing.CategoricalEncoder`).
+
+Input and output may be CSV or Parquet, picked by file extension. The input
+may also be a feature store directory written by `churn_serving.feature_store`,
+in which case workers read their row ranges straight from the memory-mapped
+columns instead of parsing text. The input is cut into chunks and each chunk is
+parsed, scored and serialized by a pool of worker processes, so memory stays
+bounded and all cores are used. The parent reads the model weights once and shares them with the
+workers through shared memory (see `churn_serving.parallel`) rather than
+every worker loading the model file itself.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import pandas as pd
+
+from churn_serving import autotune, backends, feature_store, parallel, pipeline
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(path, chunk_rows):
+    """Yield DataFrames of at most `chunk_rows` rows from a CSV or Parquet file."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def read_columns(path):
+    """Return the column names of a CSV, Parquet or feature store without reading rows."""
+    if feature_store.is_store(path):
+        return feature_store.FeatureStore(path).columns
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._file = None
+
+    def write(self, chunk):
+        self.write_serialized(parallel.serialize(chunk, self.parquet, header=self._file is None))
+
+    def write_serialized(self, data):
+        """Append a chunk serialized by `parallel.serialize` for this file's format."""
+        if self.parquet:
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, data.schema)
+            self._writer.write_table(data)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "wb")
+            self._file.write(data)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _chunk_tasks(in_path, chunk_rows, parquet, stack):
+    # (task function, argument tuples) cutting `in_path` into chunks for the
+    # `parallel` workers, which parse, score and serialize them
+    if feature_store.is_store(in_path):
+        # Workers map the row ranges themselves; only offsets cross processes
+        rows = feature_store.FeatureStore(in_path).rows
+        return parallel.score_store_rows, (
+            (in_path, start, min(start + chunk_rows, rows), parquet, start == 0)
+            for start in range(0, rows, chunk_rows)
+        )
+    if _is_parquet(in_path):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(in_path).iter_batches(batch_size=chunk_rows)
+        return parallel.score_batch, (
+            (batch, parquet, i == 0) for i, batch in enumerate(batches)
+        )
+    header, blocks = parallel.csv_blocks(stack.enter_context(open(in_path, "rb")), chunk_rows)
+    return parallel.score_csv_block, (
+        (header, block, parquet, i == 0) for i, block in enumerate(blocks)
+    )
+
+
+def score_file(in_path, out_path, workers=None, chunk_rows=None,
+               model_path=pipeline.MODEL_PATH, scaler_path=pipeline.SCALER_PATH,
+               log=None, engine=None):
+    """Score `in_path` into `out_path` using a pool of `workers` processes.
+
+    Several workers are a `parallel.ParallelScorer`: the input is cut into
+    chunks without parsing it, and each worker parses, scores and serializes
+    its chunks, which are written in input order. At most two chunks per
+    worker are in flight at once, which bounds memory regardless of the
+    input size. `engine` (see `churn_serving.backends`) picks the model's
+    engine, defaulting to ``$CHURN_ENGINE`` or Keras for one worker and to
+    `parallel.pool_engine` for several, whose workers share the NumPy
+    engine's weights unless another engine is chosen. `chunk_rows`
+    defaults to the size `churn_serving.autotune` found fastest for that
+    engine on this host. Blank inputs are filled with the training medians
+    stored with the scaler, and only distinct rows of each chunk are run
+    through the model. Returns the number of rows scored, the per-bucket
+    counts, the number of values filled per column, the rows / distinct rows
+    counts (see `pipeline.predict_unique`) and the number of categorical
+    values per column that are not a training level (see `pipeline.scale`).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        # Scored in this process, where TensorFlow keeps its default thread
+        # pools and uses every core. Loaded before tuning, which would
+        # otherwise initialise TensorFlow first.
+        engine = backends.resolve_engine(model_path, engine)
+        model, scaler = pipeline.load_model_and_scaler(model_path, scaler_path, engine)
+        parallel.set_worker_model(model, scaler)
+    else:
+        # Workers map weights loaded once here, or load the chosen engine
+        # themselves; either way they get a pickle-free scaler
+        engine = parallel.pool_engine(model_path, engine)
+        scorer = parallel.ParallelScorer.for_model(model_path, scaler_path, engine, workers)
+        scaler = scorer.scaler
+
+    try:
+        missing = pipeline.missing_columns(read_columns(in_path), scaler)
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+
+        if chunk_rows is None:
+            if workers == 1:
+                chunk_rows = autotune.tuned_chunk_rows(model_path, scaler_path, engine)
+            else:
+                # Up to CHUNKS_PER_WORKER chunks per worker are in flight at once
+                budget_mb = autotune.memory_budget_mb() / (parallel.CHUNKS_PER_WORKER * workers)
+                chunk_rows = autotune.tuned_chunk_rows(
+                    model_path, scaler_path, engine, budget_mb=budget_mb
+                )
+        rows_done = 0
+        totals = dict.fromkeys(pipeline.RISK_LABELS, 0)
+        imputed = {}
+        dedup = {}
+        unknown = {}
+
+        with contextlib.ExitStack() as stack:
+            writer = stack.enter_context(ChunkWriter(out_path))
+            fn, tasks = _chunk_tasks(in_path, chunk_rows, writer.parquet, stack)
+            if workers == 1:
+                results = (fn(*args) for args in tasks)
+            else:
+                results = scorer.imap(fn, tasks)
+
+            for data, probs, chunk_imputed, chunk_dedup, chunk_unknown in results:
+                writer.write_serialized(data)
+                for name, count in chunk_imputed.items():
+                    imputed[name] = imputed.get(name, 0) + count
+                for key, count in chunk_dedup.items():
+                    dedup[key] = dedup.get(key, 0) + count
+                for name, count in chunk_unknown.items():
+                    unknown[name] = unknown.get(name, 0) + count
+                for label, count in pipeline.risk_counts_from_probs(probs).items():
+                    totals[label] += count
+                rows_done += len(probs)
+                if log is not None:
+                    log(rows_done)
+    finally:
+        if workers > 1:
+            scorer.close()
+
+    return rows_done, totals, imputed, dedup, unknown
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving",
+        description="Score a CSV/Parquet file of customers (default: the business churn model).",
+    )
+    parser.add_argument("input",
+                        help="CSV, Parquet or feature store with the model's input columns "
+                             "(raw categorical columns are one-hot encoded)")
+    parser.add_argument("-o", "--output", required=True,
+                        help="where to write the scored rows (.csv or .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="rows per chunk (default: tuned per model and host, "
+                             "see churn_serving.autotune)")
+    parser.add_argument("--model", default=pipeline.MODEL_PATH,
+                        help="Keras model file, or .npz exported by churn_serving.numpy_engine")
+    parser.add_argument("--scaler", default=pipeline.SCALER_PATH,
+                        help="pickled scaler, or .json exported by churn_serving.preprocessing")
+    parser.add_argument("--engine", choices=backends.ENGINES,
+                        help="inference engine (default: $CHURN_ENGINE, else keras for "
+                             "--workers 1 and numpy with shared weights for several)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+
+    def log(rows_done):
+        if not args.quiet:
+            print(f"scored {rows_done:,} rows", file=sys.stderr)
+
+    try:
+        rows_done, totals, imputed, dedup, unknown = score_file(
+            args.input, args.output,
+            workers=args.workers,
+            chunk_rows=args.chunk_rows,
+            model_path=args.model,
+            scaler_path=args.scaler,
+            log=log,
+            engine=args.engine,
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{label}={count:,}" for label, count in totals.items())
+    print(f"{rows_done:,} rows scored in {elapsed:.1f}s ({summary}) -> {args.output}")
+    if imputed:
+        filled = ", ".join(f"{name}={count:,}" for name, count in imputed.items())
+        print(f"blank values filled with training medians: {filled}")
+    if unknown:
+        levels = ", ".join(f"{name}={count:,}" for name, count in unknown.items())
+        print(f"unknown categorical values scored as the baseline level: {levels}")
+    if dedup.get("scored", rows_done) < rows_done:
+        print(f"{dedup['scored']:,} distinct rows run through the model "
+              f"(dedup ratio {pipeline.dedup_ratio(dedup):.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
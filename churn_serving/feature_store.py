@@ -0,0 +1,208 @@
+"""Memory-mapped columnar feature store for scoring datasets.
+
+Scoring the same large CSV again means parsing all of its text again.
+`convert` parses it once and writes every column to its own raw binary file
+next to a `manifest.json` describing names, dtypes and the row count.
+Numeric columns are stored as float64 (NaN = blank), ID columns as int64,
+and text columns such as `Gender` as int32 dictionary codes (-1 = blank) with
+their levels in the manifest. `FeatureStore` memory-maps those files, so
+reading a slice of rows is a view onto the page cache rather than a parse,
+and repeat scoring runs at disk speed.
+
+Convert from the command line (from the repository root)::
+
+    python -m churn_serving.feature_store customers.csv customers.store
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+# Version 1 stores (numeric columns only) read the same way
+READ_VERSIONS = (1, 2)
+CHUNK_ROWS = 200_000
+# Columns kept as integers; other numeric columns are stored as float64
+ID_COLUMNS = ("CustomerID",)
+CODE_DTYPE = np.dtype("<i4")
+
+
+def is_store(path):
+    """True if `path` is a feature store directory."""
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _column_dtype(name):
+    return np.dtype("<i8") if name in ID_COLUMNS else np.dtype("<f8")
+
+
+class StoreWriter:
+    """Append DataFrame chunks to a new feature store; `close` writes the manifest.
+
+    `columns` defaults to every column of the first chunk. Non-numeric
+    columns are dictionary-coded, with levels added as later chunks bring
+    new ones.
+    """
+
+    def __init__(self, store_dir, columns=None, source=None):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.columns = columns
+        self.source = source
+        self.rows = 0
+        self._files = {}
+        # Dictionary-coded column -> {level: code}
+        self._levels = {}
+
+    def _codes(self, name, values):
+        levels = self._levels[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        table = np.array([levels.setdefault(str(u), len(levels)) for u in uniques] + [-1],
+                         dtype=CODE_DTYPE)
+        # Code -1 (blank) picks the trailing -1 of the table
+        return table[codes]
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        if not self._files:
+            for i, name in enumerate(self.columns):
+                if not pd.api.types.is_numeric_dtype(chunk[name]):
+                    self._levels[name] = {}
+                self._files[name] = open(os.path.join(self.store_dir, f"col_{i:03d}.bin"), "wb")
+        for name in self.columns:
+            if name in self._levels:
+                values = self._codes(name, chunk[name])
+            else:
+                values = chunk[name].to_numpy(dtype=_column_dtype(name))
+            values.tofile(self._files[name])
+        self.rows += len(chunk)
+
+    def _column_entry(self, i, name):
+        entry = {"name": name, "file": f"col_{i:03d}.bin"}
+        if name in self._levels:
+            entry["dtype"] = CODE_DTYPE.str
+            entry["categories"] = list(self._levels[name])
+        else:
+            entry["dtype"] = _column_dtype(name).str
+        return entry
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "source": self.source,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": self.rows,
+            "columns": [self._column_entry(i, name) for i, name in enumerate(self.columns or [])],
+        }
+        with open(os.path.join(self.store_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert(csv_path, store_dir, columns=None, chunk_rows=CHUNK_ROWS):
+    """Parse `csv_path` once and write its columns to `store_dir`.
+
+    `columns` defaults to every column of the file. Returns the opened
+    FeatureStore.
+    """
+    with StoreWriter(store_dir, columns, source=os.path.abspath(csv_path)) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            writer.write(chunk)
+    return FeatureStore(store_dir)
+
+
+class FeatureStore:
+    """Read-only, memory-mapped view of a converted dataset."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") not in READ_VERSIONS:
+            raise ValueError(f"Unsupported feature store version in {store_dir}")
+        self.rows = self.manifest["rows"]
+        self._columns = {c["name"]: c for c in self.manifest["columns"]}
+        self._maps = {}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def categories(self, name):
+        """Levels of a dictionary-coded column (code i is levels[i]), else None."""
+        return self._columns[name].get("categories")
+
+    def column(self, name):
+        """The whole column as a read-only np.memmap (codes for text columns)."""
+        mm = self._maps.get(name)
+        if mm is None:
+            spec = self._columns[name]
+            path = os.path.join(self.store_dir, spec["file"])
+            if self.rows == 0:
+                mm = np.empty(0, dtype=spec["dtype"])
+            else:
+                mm = np.memmap(path, dtype=spec["dtype"], mode="r", shape=(self.rows,))
+            self._maps[name] = mm
+        return mm
+
+    def values(self, name, start=0, stop=None):
+        """Rows [start, stop) of a column: a memmap view, or a pd.Categorical over the codes."""
+        view = self.column(name)[start:stop]
+        levels = self.categories(name)
+        if levels is None:
+            return view
+        return pd.Categorical.from_codes(view, levels, validate=False)
+
+    def slices(self, columns=None, chunk_rows=CHUNK_ROWS, start=0, stop=None):
+        """Yield (lo, hi, {name: values}) over rows [start, stop) without building DataFrames.
+
+        Numeric columns are memmap views; text columns are pandas
+        Categoricals over their codes (see `values`).
+        """
+        columns = self.columns if columns is None else columns
+        stop = self.rows if stop is None else stop
+        for lo in range(start, stop, chunk_rows):
+            hi = min(lo + chunk_rows, stop)
+            yield lo, hi, {name: self.values(name, lo, hi) for name in columns}
+
+    def frame(self, start=0, stop=None, columns=None):
+        """Rows [start, stop) as a DataFrame."""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.values(name, start, stop) for name in columns})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.feature_store",
+        description="Convert a CSV into a memory-mapped columnar feature store.",
+    )
+    parser.add_argument("csv", help="CSV file to convert")
+    parser.add_argument("store", help="output directory")
+    parser.add_argument("--columns", nargs="+", help="columns to keep (default: all)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    store = convert(args.csv, args.store, columns=args.columns, chunk_rows=args.chunk_rows)
+    print(f"{store.rows:,} rows x {len(store.columns)} columns -> {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
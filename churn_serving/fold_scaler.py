@@ -0,0 +1,107 @@
+"""Fold the StandardScaler into the first Dense layer.
+
+Scaling is affine and the networks start with a Dense layer, so
+
+    relu(((x - mean) / scale) @ W + b) == relu(x @ W' + b')
+
+with ``W' = W / scale[:, None]`` and ``b' = b - (mean / scale) @ W``.
+`fold` computes that in float64 and `export_folded` writes the result as a
+single `.folded.npz` for `churn_serving.numpy_engine`, carrying the scaler's
+feature names and mean/scale as metadata. Serving it (the ``numpy-folded``
+engine of `churn_serving.backends`) takes raw features, skips the scaling
+pass and never loads the scaler pickle or sklearn.
+
+Export from the command line (from the repository root)::
+
+    python -m churn_serving.fold_scaler --models business deploy final
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from churn_serving import numpy_engine, preprocessing
+
+FOLDED_SUFFIX = ".folded.npz"
+
+
+def fold(engine, scaler):
+    """A NumpyMLP equal to `scaler` followed by `engine`, on raw features."""
+    if engine.input_scaler is not None:
+        raise ValueError("Model already has a scaler folded in")
+    if scaler.n_features_in_ != engine.input_dim:
+        raise ValueError(
+            f"Scaler has {scaler.n_features_in_} features but the model takes {engine.input_dim}"
+        )
+    # Zero-variance features are left unscaled, as in sklearn
+    scale = scaler.scale_.astype(np.float64)
+    inv_scale = 1 / np.where(scale == 0, 1, scale)
+    mean = scaler.mean_.astype(np.float64)
+
+    kernel, bias, _, activation = engine.layers[0]
+    kernel = kernel.astype(np.float64)
+    first = (
+        kernel * inv_scale[:, np.newaxis],
+        bias.astype(np.float64) - (mean * inv_scale) @ kernel,
+        activation,
+    )
+    rest = [(k, b, a) for k, b, _, a in engine.layers[1:]]
+    return numpy_engine.NumpyMLP([first] + rest, input_scaler=scaler.to_config())
+
+
+def folded_path(model_path):
+    return os.path.splitext(model_path)[0] + FOLDED_SUFFIX
+
+
+def export_folded(model_path, scaler_path, out_path=None):
+    """Fold `scaler_path` into `model_path` and save it; returns the output path."""
+    out_path = out_path or folded_path(model_path)
+    engine = numpy_engine.load(model_path)
+    folded = fold(engine, preprocessing.load_fused_scaler(scaler_path))
+    folded.save_npz(out_path)
+    return out_path
+
+
+def max_abs_diff(model_path, scaler_path, folded, rows=1024, seed=0):
+    """Largest difference between scaler + model and the folded model on raw inputs."""
+    import pandas as pd
+
+    scaler = preprocessing.load_scaler(scaler_path)
+    fused = preprocessing.load_fused_scaler(scaler_path)
+    rng = np.random.default_rng(seed)
+    X = fused.inverse_transform(rng.normal(size=(rows, fused.n_features_in_)))
+    if not isinstance(scaler, preprocessing.FusedScaler):
+        X = pd.DataFrame(X, columns=fused.feature_names_in_)
+    expected = numpy_engine.load(model_path).forward(scaler.transform(X))
+    return float(np.max(np.abs(expected - folded.forward(np.asarray(X)))))
+
+
+def main(argv=None):
+    from churn_serving import backends, models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.fold_scaler",
+        description="Fold each model's StandardScaler into its first Dense layer.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--atol", type=float, default=backends.ATOL,
+                        help=f"tolerance for the equivalence check (default: {backends.ATOL})")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for name in args.models:
+        spec = models.get_spec(name)
+        out_path = export_folded(spec.model_path, spec.scaler_path)
+        diff = max_abs_diff(spec.model_path, spec.scaler_path, numpy_engine.load(out_path))
+        ok = diff <= args.atol
+        print(f"{name}: {os.path.relpath(out_path, models.ROOT_DIR)}, "
+              f"max |scaler + model - folded| = {diff:.2e} ({'ok' if ok else 'MISMATCH'})")
+        status = status or (0 if ok else 1)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Incremental re-scoring of a customer extract, keyed by CustomerID.
+
+Scoring the whole customer base every night repeats the work for every
+customer whose features did not change. `score_incremental` keeps a state
+file with one entry per customer: the ID, a 64-bit hash of the model's input
+columns and the last probability. Each run hashes the new extract, scores
+only the rows that are new or whose hash differs, and carries the stored
+probability forward for the rest, so the model sees a number of rows
+proportional to what changed rather than to the customer count. The output
+is the full extract with Churn_Probability and Churn_Risk, as from
+`python -m churn_serving`, and the state is replaced by the new extract's.
+
+The state records the model, scaler and input columns it was built with
+(see `cache.artifact_fingerprint`); if any of them differ the run re-scores
+everything. Example (from the repository root)::
+
+    python -m churn_serving.incremental customers.csv -o scored.csv --state scores.npz
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, cache, cli, feature_store, pipeline, synthetic
+
+FORMAT_VERSION = 2
+CHUNK_ROWS = 200_000
+
+
+def id_column(config_path=synthetic.CONFIG_PATH):
+    """The customer ID column named in the preprocessing config (`id_col`)."""
+    with open(config_path) as f:
+        return json.load(f)["id_col"]
+
+
+def customer_ids(values, id_col, first_row=0):
+    """`values` as int64 customer IDs.
+
+    Raises ValueError if any is blank or not a whole number (such as text,
+    or 12.5), naming the first such data row (`values` starting after
+    `first_row` rows); a row without a usable ID can be neither matched to
+    the state nor stored in it.
+    """
+    values = pd.Series(np.asarray(values))
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.to_numpy(dtype=np.int64)
+    numbers = pd.to_numeric(values, errors="coerce").astype(np.float64)
+    with np.errstate(invalid="ignore"):
+        valid = (numbers == np.round(numbers)) & (np.abs(numbers) < 2.0 ** 63)
+    if not valid.all():
+        blank = int(values.isna().sum())
+        other = int((~valid).sum()) - blank
+        row = first_row + int(np.flatnonzero(~valid.to_numpy())[0]) + 1
+        raise ValueError(
+            f"{id_col} must be a whole number on every row ({blank:,} blank, "
+            f"{other:,} not a whole number; first at data row {row:,})"
+        )
+    return numbers.to_numpy().astype(np.int64)
+
+
+def row_hashes(df, columns):
+    """64-bit hash per row of `columns` of a DataFrame or dict of column values.
+
+    Numbers are hashed as float64, so an integer column that gains a blank
+    (and turns float) between extracts keeps its hashes; text hashes the
+    same whether it is read as strings or as a categorical.
+    """
+    h = None
+    for name in columns:
+        values = df[name]
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            column = pd.util.hash_array(np.asarray(values, dtype=np.float64))
+        else:
+            column = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+        if h is None:
+            h = column.astype(np.uint64)
+            continue
+        h *= np.uint64(0x9E3779B97F4A7C15)
+        h ^= column
+        h ^= h >> np.uint64(29)
+    return h
+
+
+def _take(inputs, rows):
+    if isinstance(inputs, pd.DataFrame):
+        return inputs.iloc[rows]
+    return {name: values[rows] for name, values in inputs.items()}
+
+
+def state_key(model_path, scaler_path, engine, columns):
+    """What a state file's hashes and scores are valid for."""
+    paths = pipeline.artifact_paths(model_path, scaler_path, engine)
+    return f"v{FORMAT_VERSION}|{cache.artifact_fingerprint(paths)}|{'|'.join(columns)}"
+
+
+def load_state(path, key):
+    """(ids, hashes, probs) sorted by ID, or empty arrays if `path` is missing or stale."""
+    try:
+        with np.load(path) as state:
+            if str(state["key"]) == key:
+                return state["ids"], state["hashes"], state["probs"]
+    except (OSError, KeyError, ValueError):
+        pass
+    return np.empty(0, np.int64), np.empty(0, np.uint64), np.empty(0, np.float32)
+
+
+def save_state(path, key, ids, hashes, probs):
+    """Write a state file atomically; for repeated IDs the last row wins."""
+    order = np.argsort(ids, kind="stable")
+    ids, hashes, probs = ids[order], hashes[order], probs[order]
+    last = np.append(ids[1:] != ids[:-1], True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, key=np.array(key), ids=ids[last], hashes=hashes[last], probs=probs[last])
+    os.replace(tmp_path, path)
+
+
+def _chunks(path, chunk_rows, columns):
+    # (inputs, output rows) per chunk; a feature store is hashed and scored
+    # from its memory-mapped columns, the frame is only for the output
+    if feature_store.is_store(path):
+        store = feature_store.FeatureStore(path)
+        for lo, hi, view in store.slices(columns, chunk_rows):
+            yield view, store.frame(lo, hi)
+    else:
+        for chunk in cli.read_chunks(path, chunk_rows):
+            yield chunk, chunk
+
+
+def score_incremental(in_path, out_path, state_path, model_path=pipeline.MODEL_PATH,
+                      scaler_path=pipeline.SCALER_PATH, engine=None, id_col=None,
+                      chunk_rows=CHUNK_ROWS, log=None):
+    """Score `in_path` into `out_path`, re-scoring only customers new or changed since the last run.
+
+    Returns a dict of counts: ``rows``, ``new``, ``changed``, ``carried``
+    (rows whose stored probability was reused), ``dropped`` (customers in the
+    old state but not in this extract), ``full`` (True when there was no
+    usable state), the per-bucket ``totals`` and ``imputed`` / ``dedup`` /
+    ``unknown`` as from `pipeline.score_frame` for the re-scored rows.
+    """
+    id_col = id_col or id_column()
+    engine = backends.resolve_engine(model_path, engine)
+    model, scaler = pipeline.load_model_and_scaler(model_path, scaler_path, engine)
+    columns = cli.read_columns(in_path)
+    if id_col not in columns:
+        raise ValueError(f"Missing customer ID column: {id_col}")
+    missing = pipeline.missing_columns(columns, scaler)
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    hashed = pipeline.input_columns(scaler, columns)
+    key = state_key(model_path, scaler_path, engine, hashed)
+
+    old_ids, old_hashes, old_probs = load_state(state_path, key)
+    stats = {"rows": 0, "new": 0, "changed": 0, "carried": 0, "full": not len(old_ids),
+             "totals": dict.fromkeys(pipeline.RISK_LABELS, 0), "imputed": {}, "dedup": {},
+             "unknown": {}}
+    new_ids, new_hashes, new_probs = [], [], []
+
+    with cli.ChunkWriter(out_path) as writer:
+        for inputs, chunk in _chunks(in_path, chunk_rows, [id_col] + hashed):
+            ids = customer_ids(inputs[id_col], id_col, stats["rows"])
+            hashes = row_hashes(inputs, hashed)
+            pos = np.minimum(np.searchsorted(old_ids, ids), max(len(old_ids) - 1, 0))
+            known = old_ids[pos] == ids if len(old_ids) else np.zeros(len(ids), dtype=bool)
+            same = known & (old_hashes[pos] == hashes) if len(old_ids) else known
+
+            probs = np.empty(len(ids), dtype=np.float32)
+            probs[same] = old_probs[pos[same]]
+            todo = np.flatnonzero(~same)
+            if len(todo):
+                probs[todo] = pipeline.predict_columns(model, scaler, _take(inputs, todo),
+                                                       imputed=stats["imputed"],
+                                                       dedup=stats["dedup"],
+                                                       unknown=stats["unknown"])
+
+            chunk["Churn_Probability"] = probs
+            chunk["Churn_Risk"] = pipeline.bucket_risk(probs)
+            writer.write(chunk)
+            for label, count in pipeline.risk_counts_from_probs(probs).items():
+                stats["totals"][label] += count
+
+            new_ids.append(ids)
+            new_hashes.append(hashes)
+            new_probs.append(probs)
+            stats["rows"] += len(chunk)
+            stats["new"] += int((~known).sum())
+            stats["changed"] += int((known & ~same).sum())
+            stats["carried"] += int(same.sum())
+            if log is not None:
+                log(stats["rows"])
+
+    ids = np.concatenate(new_ids) if new_ids else np.empty(0, np.int64)
+    stats["dropped"] = int((~np.isin(old_ids, ids)).sum())
+    save_state(
+        state_path, key, ids,
+        np.concatenate(new_hashes) if new_hashes else np.empty(0, np.uint64),
+        np.concatenate(new_probs) if new_probs else np.empty(0, np.float32),
+    )
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.incremental",
+        description="Score a customer extract, re-scoring only customers that are new or changed.",
+    )
+    parser.add_argument("input", help="CSV, Parquet or feature store with a customer ID column")
+    parser.add_argument("-o", "--output", required=True,
+                        help="where to write the scored rows (.csv or .parquet)")
+    parser.add_argument("--state", required=True,
+                        help="state file of per-customer hashes and scores (.npz), "
+                             "created on the first run")
+    parser.add_argument("--id-col", default=None,
+                        help="customer ID column (default: id_col of the preprocessing config)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--model", default=pipeline.MODEL_PATH,
+                        help="Keras model file, or .npz exported by churn_serving.numpy_engine")
+    parser.add_argument("--scaler", default=pipeline.SCALER_PATH,
+                        help="pickled scaler, or .json exported by churn_serving.preprocessing")
+    parser.add_argument("--engine", choices=backends.ENGINES,
+                        help="inference engine (default: $CHURN_ENGINE or keras)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    def log(rows_done):
+        if not args.quiet:
+            print(f"read {rows_done:,} rows", file=sys.stderr)
+
+    try:
+        stats = score_incremental(
+            args.input, args.output, args.state,
+            model_path=args.model,
+            scaler_path=args.scaler,
+            engine=args.engine,
+            id_col=args.id_col,
+            chunk_rows=args.chunk_rows,
+            log=log,
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    elapsed = time.perf_counter() - start
+    rescored = stats["new"] + stats["changed"]
+    summary = ", ".join(f"{label}={count:,}" for label, count in stats["totals"].items())
+    print(f"{stats['rows']:,} rows in {elapsed:.1f}s ({summary}) -> {args.output}")
+    print(f"re-scored {rescored:,} ({stats['new']:,} new, {stats['changed']:,} changed), "
+          f"carried forward {stats['carried']:,}, dropped {stats['dropped']:,}"
+          + (" (no usable state: full re-score)" if stats["full"] and stats["rows"] else ""))
+    if stats["imputed"]:
+        filled = ", ".join(f"{name}={count:,}" for name, count in stats["imputed"].items())
+        print(f"blank values filled with training medians: {filled}")
+    if stats["unknown"]:
+        levels = ", ".join(f"{name}={count:,}" for name, count in stats["unknown"].items())
+        print(f"unknown categorical values scored as the baseline level: {levels}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""The deployed churn models, their artifacts and their input features."""
+
+import os
+
+from churn_serving import pipeline, preprocessing
+
+ROOT_DIR = pipeline.ROOT_DIR
+
+# -------------------------------------------------
+# Feature definitions of the 29-input models
+# (Churn-Prediction/app.py and the root app.py), in the order their scalers
+# were fitted on: 13 numeric columns, then the one-hot columns written by
+# pd.get_dummies(drop_first=True) for the five categorical columns
+# -------------------------------------------------
+FEATURES_29 = [
+    ("Tenure", "Number of months the customer has stayed"),
+    ("CityTier", "1 = Metro, 2 = Urban, 3 = Rural"),
+    ("WarehouseToHome", "Distance from warehouse to home (km)"),
+    ("HourSpendOnApp", "Average hours spent on app per day"),
+    ("NumberOfDeviceRegistered", "Total registered devices"),
+    ("SatisfactionScore", "Customer satisfaction score (1–5)"),
+    ("NumberOfAddress", "Number of saved addresses"),
+    ("Complain", "Complaint raised last month (1 = Yes, 0 = No)"),
+    ("OrderAmountHikeFromlastYear", "Increase in order amount (%)"),
+    ("CouponUsed", "Coupons used last month"),
+    ("OrderCount", "Orders placed last month"),
+    ("DaySinceLastOrder", "Days since last order"),
+    ("CashbackAmount", "Average cashback last month"),
+    ("PreferredLoginDevice_Mobile Phone", "Logs in on a mobile phone (1 = Yes, 0 = No)"),
+    ("PreferredLoginDevice_Phone", "Logs in on a phone (1 = Yes, 0 = No; both 0 = Computer)"),
+    ("PreferredPaymentMode_COD", "Pays COD (1 = Yes, 0 = No)"),
+    ("PreferredPaymentMode_Cash on Delivery", "Pays cash on delivery (1 = Yes, 0 = No)"),
+    ("PreferredPaymentMode_Credit Card", "Pays by credit card (1 = Yes, 0 = No)"),
+    ("PreferredPaymentMode_Debit Card", "Pays by debit card (1 = Yes, 0 = No)"),
+    ("PreferredPaymentMode_E wallet", "Pays by e-wallet (1 = Yes, 0 = No)"),
+    ("PreferredPaymentMode_UPI", "Pays by UPI (1 = Yes, 0 = No; all 0 = CC)"),
+    ("Gender_Male", "Male = 1, Female = 0"),
+    ("PreferedOrderCat_Grocery", "Mostly orders grocery (1 = Yes, 0 = No)"),
+    ("PreferedOrderCat_Laptop & Accessory", "Mostly orders laptops & accessories (1 = Yes, 0 = No)"),
+    ("PreferedOrderCat_Mobile", "Mostly orders mobile (1 = Yes, 0 = No)"),
+    ("PreferedOrderCat_Mobile Phone", "Mostly orders mobile phones (1 = Yes, 0 = No)"),
+    ("PreferedOrderCat_Others", "Mostly orders other items (1 = Yes, 0 = No; all 0 = Fashion)"),
+    ("MaritalStatus_Married", "Married (1 = Yes, 0 = No)"),
+    ("MaritalStatus_Single", "Single (1 = Yes, 0 = No; both 0 = Divorced)"),
+]
+
+
+class ModelSpec:
+    """Where a deployed model's artifacts live and which inputs it takes.
+
+    `features` are the columns the scaler was fitted on, in its order, read
+    from the scaler's JSON export (no sklearn needed).
+    """
+
+    def __init__(self, name, model_path, scaler_path):
+        self.name = name
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self._features = None
+
+    @property
+    def features(self):
+        if self._features is None:
+            scaler = preprocessing.FusedScaler.from_json(self.json_scaler_path)
+            self._features = [str(n) for n in scaler.feature_names_in_]
+        return self._features
+
+    @property
+    def numpy_model_path(self):
+        """The `.npz` exported by churn_serving.numpy_engine."""
+        return os.path.splitext(self.model_path)[0] + ".npz"
+
+    @property
+    def json_scaler_path(self):
+        """The `.json` exported by churn_serving.preprocessing."""
+        return os.path.splitext(self.scaler_path)[0] + ".json"
+
+    def __repr__(self):
+        return f"ModelSpec({self.name!r}, {os.path.relpath(self.model_path, ROOT_DIR)!r})"
+
+
+MODELS = {
+    spec.name: spec
+    for spec in [
+        # Churn-Prediction1/app.py
+        ModelSpec(
+            "business",
+            pipeline.MODEL_PATH,
+            pipeline.SCALER_PATH,
+        ),
+        # Churn-Prediction/app.py
+        ModelSpec(
+            "deploy",
+            os.path.join(ROOT_DIR, "Churn-Prediction", "churn_final_model_deploy.h5"),
+            os.path.join(ROOT_DIR, "Churn-Prediction", "scaler.pkl"),
+        ),
+        # app.py (same 29 scaler inputs as the deploy model)
+        ModelSpec(
+            "final",
+            os.path.join(ROOT_DIR, "churn_final_model.keras"),
+            os.path.join(ROOT_DIR, "scaler.pkl"),
+        ),
+    ]
+}
+
+
+def get_spec(name):
+    """Look up a deployed model by name; raises KeyError for unknown names."""
+    return MODELS[name]
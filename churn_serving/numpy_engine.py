@@ -0,0 +1,241 @@
+"""TensorFlow-free inference for the churn MLPs.
+
+The churn models are small stacks of Dense layers (with Dropout, which is a
+no-op at inference). `export_npz` reads the Dense kernels, biases and
+activations straight out of a Keras `.h5` / `.keras` file with h5py and
+writes them to a compact `.npz`. `NumpyMLP` runs the forward pass with plain
+NumPy and exposes the same `predict` signature as a Keras model, so it can be
+dropped into the scoring pipeline in place of `tf.keras.models.load_model`.
+
+Export from the command line (from the repository root)::
+
+    python -m churn_serving.numpy_engine Churn-Prediction1/churn_model_business.h5 --check
+"""
+
+import argparse
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+
+# Layers that do nothing at inference time
+PASSTHROUGH_LAYERS = {"InputLayer", "Dropout"}
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _sigmoid(x):
+    with np.errstate(over="ignore"):
+        np.negative(x, out=x)
+        np.exp(x, out=x)
+    x += 1
+    return np.reciprocal(x, out=x)
+
+
+def _tanh(x):
+    return np.tanh(x, out=x)
+
+
+def _linear(x):
+    return x
+
+
+ACTIVATIONS = {
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "tanh": _tanh,
+    "linear": _linear,
+}
+
+
+# -------------------------------------------------
+# Reading Keras model files
+# -------------------------------------------------
+def _layer_configs(config):
+    if config.get("class_name") != "Sequential":
+        raise ValueError("Only Sequential models are supported")
+    return config["config"]["layers"]
+
+
+def _check_layer(layer):
+    cls = layer["class_name"]
+    if cls not in PASSTHROUGH_LAYERS and cls != "Dense":
+        raise ValueError(f"Unsupported layer type for NumPy inference: {cls}")
+    if cls == "Dense":
+        activation = layer["config"]["activation"]
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation: {activation}")
+    return cls == "Dense"
+
+
+def _read_h5_layers(path):
+    """Dense layers from a Keras 2 `.h5` file as (kernel, bias, activation)."""
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        config = json.loads(f.attrs["model_config"])
+        weights = f["model_weights"]
+        dense = []
+        for layer in _layer_configs(config):
+            if not _check_layer(layer):
+                continue
+            name = layer["config"]["name"]
+            group = weights[name]
+            names = [n.decode() if isinstance(n, bytes) else n
+                     for n in group.attrs["weight_names"]]
+            arrays = {n.split("/")[-1].split(":")[0]: group[n][()] for n in names}
+            bias = arrays.get("bias")
+            dense.append((arrays["kernel"], bias, layer["config"]["activation"]))
+    return dense
+
+
+def _read_keras_layers(path):
+    """Dense layers from a Keras 3 `.keras` archive as (kernel, bias, activation)."""
+    import h5py
+
+    with zipfile.ZipFile(path) as archive:
+        config = json.loads(archive.read("config.json"))
+        with archive.open("model.weights.h5") as weights_file:
+            with h5py.File(weights_file, "r") as f:
+                dense = []
+                for layer in _layer_configs(config):
+                    if not _check_layer(layer):
+                        continue
+                    group = f["layers"][layer["config"]["name"]]["vars"]
+                    bias = group["1"][()] if "1" in group else None
+                    dense.append((group["0"][()], bias, layer["config"]["activation"]))
+    return dense
+
+
+def read_dense_layers(model_path):
+    """Return the Dense layers of a Keras model file as (kernel, bias, activation)."""
+    if model_path.endswith(".keras"):
+        return _read_keras_layers(model_path)
+    return _read_h5_layers(model_path)
+
+
+# -------------------------------------------------
+# Forward pass
+# -------------------------------------------------
+class NumpyMLP:
+    """Forward pass of a Dense-only Keras model in NumPy (float32).
+
+    `input_scaler` is set on models whose first layer has the scaler folded
+    in (see `churn_serving.fold_scaler`): the scaler config, in
+    `churn_serving.preprocessing`'s JSON layout, that the model now applies
+    to raw features itself.
+    """
+
+    def __init__(self, layers, input_scaler=None):
+        self.input_scaler = input_scaler
+        self.layers = []
+        for kernel, bias, activation in layers:
+            kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+            if bias is None:
+                bias = np.zeros(kernel.shape[1], dtype=np.float32)
+            bias = np.ascontiguousarray(bias, dtype=np.float32)
+            self.layers.append((kernel, bias, ACTIVATIONS[activation], activation))
+        if not self.layers:
+            raise ValueError("Model has no Dense layers")
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    @classmethod
+    def from_keras_file(cls, model_path):
+        return cls(read_dense_layers(model_path))
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data["activations"]]
+            layers = [
+                (data[f"kernel_{i}"], data[f"bias_{i}"], activation)
+                for i, activation in enumerate(activations)
+            ]
+            input_scaler = None
+            if "input_scaler" in data:
+                input_scaler = json.loads(str(data["input_scaler"]))
+        return cls(layers, input_scaler)
+
+    def save_npz(self, path):
+        arrays = {}
+        for i, (kernel, bias, _, _) in enumerate(self.layers):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        arrays["activations"] = np.array([a for _, _, _, a in self.layers])
+        if self.input_scaler is not None:
+            arrays["input_scaler"] = np.array(json.dumps(self.input_scaler))
+        np.savez_compressed(path, **arrays)
+
+    def forward(self, X):
+        """Run the network on a 2-D batch and return a (n, units) float32 array."""
+        h = np.asarray(X, dtype=np.float32)
+        for kernel, bias, activation, _ in self.layers:
+            h = h @ kernel
+            h += bias
+            h = activation(h)
+        return h
+
+    def predict(self, X, batch_size=None, verbose=0):
+        """Keras-compatible `predict`; `batch_size` and `verbose` are ignored."""
+        return self.forward(X)
+
+    __call__ = forward
+
+
+def load(path):
+    """Load a NumpyMLP from an exported `.npz` or straight from a Keras file."""
+    if path.endswith(".npz"):
+        return NumpyMLP.from_npz(path)
+    return NumpyMLP.from_keras_file(path)
+
+
+def export_npz(model_path, out_path=None):
+    """Export the Dense weights of `model_path` to `.npz`; returns the output path."""
+    out_path = out_path or os.path.splitext(model_path)[0] + ".npz"
+    NumpyMLP.from_keras_file(model_path).save_npz(out_path)
+    return out_path
+
+
+def max_abs_diff(model_path, engine, rows=1024, seed=0):
+    """Largest difference between Keras `predict` and `engine` on random inputs."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    X = np.random.default_rng(seed).normal(size=(rows, engine.input_dim)).astype(np.float32)
+    expected = model.predict(X, batch_size=rows, verbose=0)
+    return float(np.max(np.abs(expected - engine.predict(X))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.numpy_engine",
+        description="Export Keras churn models to .npz for TensorFlow-free inference.",
+    )
+    parser.add_argument("models", nargs="+", help="Keras .h5 / .keras model files")
+    parser.add_argument("--check", action="store_true",
+                        help="compare against Keras predict (needs TensorFlow)")
+    parser.add_argument("--atol", type=float, default=1e-5,
+                        help="tolerance for --check (default: 1e-5)")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for model_path in args.models:
+        out_path = export_npz(model_path)
+        print(f"{model_path} -> {out_path}")
+        if args.check:
+            diff = max_abs_diff(model_path, NumpyMLP.from_npz(out_path))
+            ok = diff <= args.atol
+            print(f"  max |keras - numpy| = {diff:.2e} ({'ok' if ok else 'MISMATCH'})")
+            status = status or (0 if ok else 1)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Export the churn models to ONNX with the scaler built in.
+
+`export_onnx` reads the Dense layers with `churn_serving.numpy_engine` (no
+TensorFlow needed) and the fitted scaler, and writes an ONNX graph that
+starts with the scaler as an affine `Mul`/`Add` step, followed by one
+`Gemm` + activation per Dense layer. The exported model therefore takes raw
+feature values, and serving it with ONNX Runtime (the ``onnx`` engine of
+`churn_serving.backends`) needs neither TensorFlow nor sklearn; see
+`requirements-onnx.txt` for that slimmer set of dependencies. The scaler's
+mean/scale are also stored in the model's metadata, so the serving side
+knows the feature names and can verify the export.
+
+Export from the command line (from the repository root)::
+
+    python -m churn_serving.onnx_export --models business deploy final --check
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from churn_serving import numpy_engine, preprocessing
+
+OPSET = 13
+# Oldest IR version that carries opset 13, so older ONNX Runtimes load the file
+IR_VERSION = 7
+# Metadata key holding the folded scaler in preprocessing's JSON layout
+SCALER_METADATA_KEY = "churn_serving.scaler"
+INPUT_NAME = "features"
+OUTPUT_NAME = "churn_probability"
+
+ONNX_ACTIVATIONS = {"relu": "Relu", "sigmoid": "Sigmoid", "tanh": "Tanh", "linear": None}
+
+
+def build_model(engine, scaler):
+    """ONNX ModelProto for a NumpyMLP preceded by a FusedScaler."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    initializers = []
+    nodes = []
+
+    def constant(name, value):
+        initializers.append(numpy_helper.from_array(np.asarray(value, dtype=np.float32), name))
+        return name
+
+    # (x - mean) / scale as x * inv_scale + (-mean * inv_scale)
+    inv_scale = np.where(scaler.scale_ == 0, 1, 1 / scaler.scale_).astype(np.float32)
+    nodes.append(helper.make_node(
+        "Mul", [INPUT_NAME, constant("scaler_inv_scale", inv_scale)], ["scaled_mul"],
+        name="scaler_mul"))
+    nodes.append(helper.make_node(
+        "Add", ["scaled_mul", constant("scaler_offset", -scaler.mean_ * inv_scale)], ["h0"],
+        name="scaler_add"))
+
+    h = "h0"
+    for i, (kernel, bias, _, activation) in enumerate(engine.layers):
+        dense = f"dense_{i}"
+        nodes.append(helper.make_node(
+            "Gemm", [h, constant(f"{dense}_kernel", kernel), constant(f"{dense}_bias", bias)],
+            [f"{dense}_out"], name=dense))
+        h = f"{dense}_out"
+        op = ONNX_ACTIVATIONS[activation]
+        if op is not None:
+            nodes.append(helper.make_node(op, [h], [f"{dense}_{activation}"],
+                                          name=f"{dense}_{activation}"))
+            h = f"{dense}_{activation}"
+    nodes.append(helper.make_node("Identity", [h], [OUTPUT_NAME], name="output"))
+
+    units = engine.layers[-1][0].shape[1]
+    graph = helper.make_graph(
+        nodes,
+        "churn_mlp",
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, ["rows", engine.input_dim])],
+        [helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, ["rows", units])],
+        initializers,
+    )
+    model = helper.make_model(
+        graph,
+        producer_name="churn_serving",
+        opset_imports=[helper.make_opsetid("", OPSET)],
+    )
+    model.ir_version = IR_VERSION
+    helper.set_model_props(model, {SCALER_METADATA_KEY: json.dumps(scaler.to_config())})
+    onnx.checker.check_model(model)
+    return model
+
+
+def export_onnx(model_path, scaler_path, out_path=None):
+    """Write `model_path` + `scaler_path` as one `.onnx`; returns the output path."""
+    import onnx
+
+    out_path = out_path or os.path.splitext(model_path)[0] + ".onnx"
+    engine = numpy_engine.load(model_path)
+    scaler = preprocessing.load_fused_scaler(scaler_path)
+    if scaler.n_features_in_ != engine.input_dim:
+        raise ValueError(
+            f"Scaler has {scaler.n_features_in_} features but the model takes {engine.input_dim}"
+        )
+    onnx.save(build_model(engine, scaler), out_path)
+    return out_path
+
+
+def max_abs_diff(model_path, scaler_path, backend, rows=1024, seed=0):
+    """Largest difference between scaler + NumPy engine and `backend` on raw inputs."""
+    from churn_serving import pipeline
+
+    scaler = preprocessing.load_scaler(scaler_path)
+    fused = preprocessing.load_fused_scaler(scaler_path)
+    rng = np.random.default_rng(seed)
+    X = fused.inverse_transform(rng.normal(size=(rows, fused.n_features_in_)))
+    if isinstance(scaler, preprocessing.FusedScaler):
+        X_scaled = scaler.transform(X)
+    else:
+        import pandas as pd
+
+        X_scaled = scaler.transform(pd.DataFrame(X, columns=fused.feature_names_in_))
+    expected = pipeline.predict_proba(numpy_engine.load(model_path), X_scaled)
+    return float(np.max(np.abs(expected - pipeline.predict_proba(backend, X))))
+
+
+def main(argv=None):
+    from churn_serving import backends, models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.onnx_export",
+        description="Export the churn models and their scalers to ONNX.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--check", action="store_true",
+                        help="compare ONNX Runtime against the scaler + NumPy engine")
+    parser.add_argument("--atol", type=float, default=backends.ATOL,
+                        help=f"tolerance for --check (default: {backends.ATOL})")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for name in args.models:
+        spec = models.get_spec(name)
+        out_path = export_onnx(spec.model_path, spec.scaler_path)
+        print(f"{name}: {os.path.relpath(out_path, models.ROOT_DIR)} "
+              f"({os.path.getsize(out_path) / 1024:.0f} KiB)")
+        if args.check:
+            backend = backends.OnnxBackend(out_path)
+            diff = max_abs_diff(spec.model_path, spec.scaler_path, backend)
+            ok = diff <= args.atol
+            print(f"  max |reference - onnx| = {diff:.2e} ({'ok' if ok else 'MISMATCH'})")
+            status = status or (0 if ok else 1)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Multi-core bulk scoring with model weights in shared memory.
+
+Bulk scoring used to run on one core, and a process pool would have every
+worker load its own copy of the Keras model. Here the parent reads the Dense
+weights once (no TensorFlow needed, see `churn_serving.numpy_engine`) and
+packs them into one `multiprocessing.shared_memory` block; workers map that
+block and run the NumPy forward pass on views into it. Any other engine
+(see `churn_serving.backends`) is loaded by each worker instead, with its
+thread pools pinned to one thread so the workers do not oversubscribe the
+cores.
+
+Everything per row happens in the workers: the parent only cuts the input
+into chunks without parsing it (CSV text split at line breaks by
+`csv_blocks`, Arrow record batches, or feature store row ranges), and each
+worker parses its chunk, scores it (`pipeline.score_frame`) and serializes
+the output (`serialize`), which the parent writes out in input order. The
+task functions below also run in-process after `set_worker_model`, so a
+single-process run takes the same path.
+"""
+
+import io
+import multiprocessing as mp
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, feature_store, numpy_engine, pipeline, preprocessing
+
+# Chunks in flight per worker; >1 keeps workers busy while the parent writes
+CHUNKS_PER_WORKER = 2
+# Bytes read to estimate the row length when cutting CSV blocks
+CSV_SAMPLE_BYTES = 1 << 16
+# Engine of a pool when none is chosen: its weights are shared, not reloaded
+POOL_ENGINE = "numpy"
+# Engines whose weights are shared between workers rather than loaded by each
+SHARED_ENGINES = ("numpy", "numpy-folded")
+# Thread pool sizes for workers that load their own engine
+WORKER_THREAD_ENV = {"TF_NUM_INTRAOP_THREADS": "1", "TF_NUM_INTEROP_THREADS": "1",
+                     "OMP_NUM_THREADS": "1"}
+
+
+def _attach(name):
+    # Workers are started by multiprocessing and share the parent's resource
+    # tracker, so attaching does not make them owners; the parent unlinks.
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedWeights:
+    """A NumpyMLP's kernels and biases packed into one shared memory block."""
+
+    def __init__(self, engine):
+        arrays = []
+        for kernel, bias, _, _ in engine.layers:
+            arrays.extend([kernel, bias])
+        size = sum(a.nbytes for a in arrays)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        layout = []
+        offset = 0
+        for i, (_, _, _, activation) in enumerate(engine.layers):
+            entry = []
+            for a in arrays[2 * i:2 * i + 2]:
+                view = np.ndarray(a.shape, dtype=np.float32, buffer=self.shm.buf, offset=offset)
+                view[...] = a
+                entry.append((offset, a.shape))
+                offset += a.nbytes
+            layout.append((entry[0], entry[1], activation))
+        # Picklable description that workers use to rebuild the engine
+        self.handle = (self.shm.name, layout)
+
+    @staticmethod
+    def attach(handle):
+        """Rebuild a NumpyMLP over the shared block; returns (engine, shm)."""
+        name, layout = handle
+        shm = _attach(name)
+        layers = []
+        for (k_off, k_shape), (b_off, b_shape), activation in layout:
+            kernel = np.ndarray(k_shape, dtype=np.float32, buffer=shm.buf, offset=k_off)
+            bias = np.ndarray(b_shape, dtype=np.float32, buffer=shm.buf, offset=b_off)
+            layers.append((kernel, bias, activation))
+        return numpy_engine.NumpyMLP(layers), shm
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# -------------------------------------------------
+# Chunk I/O
+# -------------------------------------------------
+def _read_lines(f, size):
+    data = f.read(size)
+    if data and not data.endswith(b"\n"):
+        data += f.readline()
+    return data
+
+
+def csv_blocks(f, chunk_rows):
+    """Split a binary CSV stream into its header line and blocks of about `chunk_rows` lines.
+
+    Returns ``(header, blocks)`` with `blocks` a generator of bytes. Blocks
+    end at line breaks and are not parsed, so records must not contain line
+    breaks inside quoted fields.
+    """
+    header = f.readline()
+
+    def blocks():
+        block = _read_lines(f, CSV_SAMPLE_BYTES)
+        if not block:
+            return
+        size = max(int(chunk_rows * len(block) / max(block.count(b"\n"), 1)), 1)
+        if len(block) < size:
+            block += _read_lines(f, size - len(block))
+        while block:
+            yield block
+            block = _read_lines(f, size)
+
+    return header, blocks()
+
+
+def serialize(chunk, parquet, header=True):
+    """A scored chunk as CSV bytes (with the header line if `header`) or an Arrow table."""
+    if parquet:
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(chunk, preserve_index=False)
+    return chunk.to_csv(index=False, header=header).encode()
+
+
+# -------------------------------------------------
+# Worker side
+# -------------------------------------------------
+# The worker's model, scaler, scaling buffer and open feature stores
+_model = None
+_scaler = None
+_weights_shm = None
+_buffer = None
+_stores = {}
+
+
+def set_worker_model(model, scaler):
+    """Score the tasks below in this process with `model` and `scaler`."""
+    global _model, _scaler, _buffer
+    _model, _scaler, _buffer = model, scaler, None
+
+
+def _init_worker(handle, scaler):
+    global _weights_shm
+    engine, _weights_shm = SharedWeights.attach(handle)
+    set_worker_model(engine, scaler)
+
+
+def _load_worker(model_path, scaler_path, engine):
+    # Set before the engine's runtime is imported, which reads them once
+    for name, value in WORKER_THREAD_ENV.items():
+        os.environ.setdefault(name, value)
+    set_worker_model(*pipeline.load_model_and_scaler(model_path, scaler_path, engine))
+
+
+def _score(chunk, parquet, header):
+    # -> (serialized output, probabilities, imputed, dedup, unknown)
+    global _buffer
+    if _buffer is None or len(_buffer) < len(chunk):
+        _buffer = pipeline.scaling_buffer(_scaler, len(chunk))
+    imputed, dedup, unknown = {}, {}, {}
+    pipeline.score_frame(_model, _scaler, chunk, out=pipeline.buffer_rows(_buffer, len(chunk)),
+                         imputed=imputed, dedup=dedup, unknown=unknown)
+    probs = chunk["Churn_Probability"].to_numpy(dtype=np.float32)
+    return serialize(chunk, parquet, header), probs, imputed, dedup, unknown
+
+
+def score_csv_block(header, block, parquet, first):
+    """Parse, score and serialize one block of `csv_blocks`."""
+    return _score(pd.read_csv(io.BytesIO(header + block)), parquet, first)
+
+
+def score_batch(batch, parquet, first):
+    """Score and serialize one Arrow record batch."""
+    return _score(batch.to_pandas(), parquet, first)
+
+
+def score_store_rows(store_dir, start, stop, parquet, first):
+    """Score and serialize rows [start, stop) of a feature store.
+
+    They are scored from the memory-mapped columns; the frame is only built
+    for the output.
+    """
+    store = _stores.get(store_dir)
+    if store is None:
+        store = _stores[store_dir] = feature_store.FeatureStore(store_dir)
+    imputed, dedup, unknown = {}, {}, {}
+    probs = pipeline.score_store(_model, _scaler, store, stop - start, imputed, dedup,
+                                 start, stop, unknown)
+    scored = store.frame(start, stop)
+    scored["Churn_Probability"] = probs
+    scored["Churn_Risk"] = pipeline.bucket_risk(probs)
+    return serialize(scored, parquet, first), probs, imputed, dedup, unknown
+
+
+# -------------------------------------------------
+# Parent side
+# -------------------------------------------------
+def pool_engine(model_path, engine=None):
+    """The engine a `ParallelScorer.for_model` pool runs `model_path` with.
+
+    An explicit `engine`, the `CHURN_ENGINE` environment variable or an
+    engine-specific model file picks the engine as in
+    `backends.resolve_engine`; otherwise the pool runs `POOL_ENGINE` rather
+    than loading Keras in every worker.
+    """
+    if engine is None and not os.environ.get(backends.ENGINE_ENV):
+        engine = backends.resolve_engine(model_path)
+        return POOL_ENGINE if engine == backends.DEFAULT_ENGINE else engine
+    return backends.resolve_engine(model_path, engine)
+
+
+class ParallelScorer:
+    """A pool of processes, each scoring chunks with the same model.
+
+    `model` is a path for `numpy_engine.load` or a loaded NumpyMLP, whose
+    weights the workers share, or a ``(model_path, scaler_path, engine)``
+    tuple that each worker loads with `pipeline.load_model_and_scaler`.
+    `scaler` is the scaler the workers score with, or for a per-worker
+    model one with the same columns.
+    """
+
+    def __init__(self, model, scaler, workers=None):
+        self.scaler = scaler
+        self.workers = workers or os.cpu_count() or 1
+        if isinstance(model, tuple):
+            self.weights = None
+            initializer, initargs = _load_worker, model
+        else:
+            engine = numpy_engine.load(model) if isinstance(model, str) else model
+            self.weights = SharedWeights(engine)
+            initializer, initargs = _init_worker, (self.weights.handle, scaler)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs,
+        )
+
+    @classmethod
+    def for_model(cls, model_path, scaler_path, engine=None, workers=None):
+        """A scorer for a Keras model and its scaler, as `pipeline.load_model_and_scaler` would.
+
+        The workers run `pool_engine(model_path, engine)`. The ``numpy`` and
+        ``numpy-folded`` (with an identity scaler) engines are loaded here
+        and their weights shared; any other engine is loaded by each worker.
+        The parent's scaler is a FusedScaler read from the scaler's JSON
+        export when there is one, with the training medians and baseline
+        levels, so the parent never needs TensorFlow and, with a JSON export,
+        no sklearn either.
+        """
+        engine = pool_engine(model_path, engine)
+        mlp = None
+        if engine in SHARED_ENGINES:
+            mlp = numpy_engine.load(backends.artifact_path(model_path, engine))
+        if mlp is not None and mlp.input_scaler is not None:
+            folded = preprocessing.FusedScaler.from_config(mlp.input_scaler)
+            scaler = preprocessing.FusedScaler.identity(folded.feature_names_in_)
+        else:
+            scaler = preprocessing.load_fused_scaler(
+                preprocessing.exported_scaler_path(scaler_path)
+            )
+        preprocessing.with_training_stats(scaler, scaler_path)
+        if mlp is None:
+            return cls((model_path, scaler_path, engine), scaler, workers)
+        return cls(mlp, scaler, workers)
+
+    def imap(self, fn, tasks):
+        """Yield `fn(*args)` for each args tuple in `tasks`, run in the workers, in order.
+
+        At most `CHUNKS_PER_WORKER` tasks per worker are in flight, so a
+        lazily read input is never held in memory all at once.
+        """
+        pending = deque()
+        for args in tasks:
+            pending.append(self._pool.submit(fn, *args))
+            if len(pending) >= CHUNKS_PER_WORKER * self.workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def score_csv(self, source, out_path, chunk_rows=pipeline.CHUNK_ROWS, on_chunk=None,
+                  preview_rows=0):
+        """`pipeline.score_csv_in_chunks`, with the blocks of `source` parsed and scored in the workers.
+
+        `source` is a path or a binary file object.
+        """
+        f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+        try:
+            header, blocks = csv_blocks(f, chunk_rows)
+            tasks = ((header, block, False, i == 0) for i, block in enumerate(blocks))
+            return _collect_csv(self.imap(score_csv_block, tasks), out_path, on_chunk,
+                                preview_rows)
+        finally:
+            if f is not source:
+                f.close()
+
+    def close(self):
+        self._pool.shutdown()
+        if self.weights is not None:
+            self.weights.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _collect_csv(results, out_path, on_chunk, preview_rows):
+    rows_done = 0
+    totals = dict.fromkeys(pipeline.RISK_LABELS, 0)
+    counts = ({}, {}, {})
+    preview = None
+    probs = []
+    with open(out_path, "wb") as out:
+        for text, chunk_probs, *chunk_counts in results:
+            out.write(text)
+            for total, chunk_count in zip(counts, chunk_counts):
+                for key, count in chunk_count.items():
+                    total[key] = total.get(key, 0) + count
+            for label, count in pipeline.risk_counts_from_probs(chunk_probs).items():
+                totals[label] += count
+            if preview is None and preview_rows:
+                preview = pd.read_csv(io.BytesIO(text), nrows=preview_rows)
+            probs.append(chunk_probs)
+            rows_done += len(chunk_probs)
+            if on_chunk is not None:
+                on_chunk(rows_done)
+    probs = np.concatenate(probs) if probs else np.empty(0, dtype=np.float32)
+    return (rows_done, totals, preview, probs, *counts)
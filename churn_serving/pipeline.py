@@ -0,0 +1,374 @@
+"""Scoring pipeline shared by the churn models (see `churn_serving.models`).
+
+Raw input columns are encoded into a scaler's layout (one-hot or
+level-coded categoricals, see `preprocessing.CategoricalEncoder`), scaled,
+with blanks filled from the training medians, and scored by any engine of
+`churn_serving.backends`, from DataFrames, CSV files in chunks or a
+feature store. The defaults below are the 8-feature business model
+(Churn-Prediction1); the 29-input deploy and final models go through the
+same functions with their own artifacts.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, preprocessing
+
+# =====================================================
+# ARTIFACT PATHS
+# =====================================================
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT_DIR, "Churn-Prediction1")
+
+MODEL_PATH = os.path.join(APP_DIR, "churn_model_business.h5")
+SCALER_PATH = os.path.join(APP_DIR, "scaler_business.pkl")
+
+# =====================================================
+# FEATURE DEFINITIONS (8 BUSINESS FEATURES)
+# =====================================================
+FEATURES = [
+    "Tenure",
+    "SatisfactionScore",
+    "Complain",
+    "DaySinceLastOrder",
+    "OrderCount",
+    "CashbackAmount",
+    "HourSpendOnApp",
+    "NumberOfDeviceRegistered"
+]
+
+RISK_BINS = [0, 0.25, 0.5, 1.0]
+RISK_LABELS = ["Low", "Medium", "High"]
+
+# Rows per chunk when streaming files through the model
+CHUNK_ROWS = 50_000
+# Chunks with more distinct rows than this fraction are scored row by row;
+# gathering the unique rows and scattering back would cost more than it saves
+DEDUP_MAX_UNIQUE_FRACTION = 0.8
+
+
+def load_model_and_scaler(model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine=None):
+    """Load the model and the fitted StandardScaler from disk.
+
+    The model is loaded through `churn_serving.backends`, so `engine` (or the
+    `CHURN_ENGINE` environment variable) picks Keras, the NumPy engine, ONNX
+    Runtime, etc.; a `.npz` model path always uses the NumPy engine and never
+    imports TensorFlow. A `.json` scaler path loads a
+    `preprocessing.FusedScaler` instead of unpickling sklearn. Engines whose
+    artifact applies the scaler itself (see `backends.KerasBackend.folded_scaler`)
+    get a pass-through scaler and the pickle is not read at all, and engines
+    that run without TensorFlow (e.g. ``tflite``) read the scaler's `.json`
+    export when there is one, so they need no sklearn either.
+
+    The scaler's `fill_values_` are the training medians stored in its JSON
+    export (see `preprocessing.load_fill_values`), used by `impute`, and its
+    `baseline_levels_` those of `preprocessing.fit_baseline_levels`.
+    """
+    model = backends.load(model_path, engine)
+    if model.folded_scaler is not None:
+        scaler = preprocessing.FusedScaler.identity(
+            model.folded_scaler.feature_names_in_, categories=model.folded_scaler.categories_
+        )
+    else:
+        if model.engine not in backends.TF_ENGINES:
+            scaler_path = preprocessing.exported_scaler_path(scaler_path)
+        scaler = preprocessing.load_scaler(scaler_path)
+    return model, preprocessing.with_training_stats(scaler, scaler_path)
+
+
+def artifact_paths(model_path=MODEL_PATH, scaler_path=SCALER_PATH, engine=None):
+    """The files that decide the scores of this model/scaler with `engine`.
+
+    That is the artifact the engine actually loads (e.g. the `.npz` for the
+    NumPy engine), the scaler and, if present, the scaler's JSON export with
+    the training medians used for blanks. Caches fingerprint these.
+    """
+    engine = backends.resolve_engine(model_path, engine)
+    paths = [backends.artifact_path(model_path, engine), scaler_path]
+    json_path = os.path.splitext(scaler_path)[0] + ".json"
+    if json_path != scaler_path and os.path.exists(json_path):
+        paths.append(json_path)
+    return paths
+
+
+def input_features(scaler):
+    """The columns `scaler` was fitted on (FEATURES if it does not record them)."""
+    names = getattr(scaler, "feature_names_in_", None)
+    return FEATURES if names is None else [str(n) for n in names]
+
+
+def input_encoder(scaler):
+    """The compiled `preprocessing.CategoricalEncoder` for `scaler`'s inputs."""
+    categories = getattr(scaler, "categories_", None) or {}
+    baselines = getattr(scaler, "baseline_levels_", None) or {}
+    return preprocessing.categorical_encoder(
+        tuple(input_features(scaler)),
+        tuple((name, tuple(levels)) for name, levels in categories.items()),
+        tuple((name, tuple(levels)) for name, levels in baselines.items()),
+    )
+
+
+def input_columns(scaler, columns):
+    """The columns of `columns` that scoring with `scaler` reads, in their order."""
+    return input_encoder(scaler).input_columns(columns)
+
+
+def missing_columns(columns, scaler=None):
+    """Return the model inputs (default: FEATURES) that are not present in `columns`.
+
+    For the 29-input models a raw categorical column such as `Gender` stands
+    in for its one-hot columns, which `scale` then encodes.
+    """
+    if scaler is None:
+        return preprocessing.categorical_encoder(tuple(FEATURES)).missing_columns(columns)
+    return input_encoder(scaler).missing_columns(columns)
+
+
+def scale(scaler, df, out=None, unknown=None):
+    """Apply the training-time scaling to the input columns of `df`.
+
+    `df` is a DataFrame or a dict of column arrays (such as feature store
+    slices). Raw categorical columns are one-hot encoded (or level-coded, see
+    `preprocessing.CategoricalEncoder`) into the scaler's layout first. With
+    a FusedScaler the result is written into the float32 buffer `out` when
+    one is given. With a dict `unknown`, the number of categorical values
+    that are not a training level is added to it per column; they encode
+    like the baseline level.
+    """
+    names = input_features(scaler)
+    encoder = input_encoder(scaler)
+    if (encoder.groups or encoder.indexed) and encoder.needs_encoding(df.keys()):
+        df = encoder.encode(df, unknown=unknown)
+    if isinstance(scaler, preprocessing.FusedScaler):
+        return scaler.transform(df, out=out)
+    if isinstance(df, dict):
+        df = pd.DataFrame(df)
+    return scaler.transform(df[names])
+
+
+def scaled_fill_values(scaler):
+    """Per-input fill values in scaled units (NaN where the scaler has none)."""
+    names = input_features(scaler)
+    fill = getattr(scaler, "fill_values_", None) or {}
+    raw = np.array([[fill.get(name, np.nan) for name in names]], dtype=np.float64)
+    if not isinstance(scaler, preprocessing.FusedScaler):
+        scaler = preprocessing.FusedScaler.from_sklearn(scaler)
+    return scaler.transform(raw)[0]
+
+
+def impute(X_scaled, fill):
+    """Replace NaNs in scaled rows by `fill`, in place; returns counts per input.
+
+    Inputs whose fill value is NaN are left as they are and not counted.
+    """
+    mask = np.isnan(X_scaled)
+    mask &= ~np.isnan(fill)
+    counts = mask.sum(axis=0)
+    if counts.any():
+        np.copyto(X_scaled, fill.astype(X_scaled.dtype), where=mask)
+    return counts
+
+
+def add_counts(totals, names, counts):
+    """Add the non-zero per-input `counts` to the dict `totals`."""
+    for i in np.flatnonzero(counts):
+        totals[names[i]] = totals.get(names[i], 0) + int(counts[i])
+    return totals
+
+
+def predict_proba(model, X_scaled):
+    """Return churn probabilities for already-scaled rows as a 1-D array."""
+    return model.predict(X_scaled, batch_size=len(X_scaled), verbose=0).flatten()
+
+
+def unique_rows(X):
+    """Index of the first occurrence of each distinct row of `X`, and the inverse.
+
+    Returns `(first, inverse)` with ``X[first][inverse] == X``. Rows are
+    hashed on their bit patterns (as 64-bit words where the row width
+    allows); on a hash collision this falls back to sorting the rows with
+    `np.unique`.
+    """
+    X = np.ascontiguousarray(X)
+    width = X.dtype.itemsize * X.shape[1]
+    words = X.view(np.uint64 if width % 8 == 0 else np.dtype(f"u{X.dtype.itemsize}"))
+    columns = np.ascontiguousarray(words.T)
+    h = np.zeros(len(X), dtype=np.uint64)
+    for column in columns:
+        h ^= column
+        h *= np.uint64(0x9E3779B97F4A7C15)
+        h ^= h >> np.uint64(29)
+    inverse, uniques = pd.factorize(h)
+    first = np.empty(len(uniques), dtype=np.intp)
+    first[inverse[::-1]] = np.arange(len(X) - 1, -1, -1)
+    if not all(np.array_equal(column[first][inverse], column) for column in columns):
+        _, first, inverse = np.unique(words, axis=0, return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+
+def predict_unique(model, X_scaled, dedup=None):
+    """`predict_proba` on the distinct rows of `X_scaled` only, scattered back to all rows.
+
+    Exact duplicates (common once features are rounded) get the same
+    probability without running the model again. With a dict `dedup`, the
+    number of rows (``"rows"``) and of rows actually run through the model
+    (``"scored"``) is added to it; see `dedup_ratio`.
+    """
+    n = len(X_scaled)
+    first, inverse = unique_rows(X_scaled) if n > 1 else (np.arange(n), np.arange(n))
+    if len(first) > DEDUP_MAX_UNIQUE_FRACTION * n:
+        probs, scored = predict_proba(model, X_scaled), n
+    else:
+        probs, scored = predict_proba(model, X_scaled[first])[inverse], len(first)
+    if dedup is not None:
+        dedup["rows"] = dedup.get("rows", 0) + n
+        dedup["scored"] = dedup.get("scored", 0) + scored
+    return probs
+
+
+def dedup_ratio(dedup):
+    """Rows per row actually run through the model (1.0 when nothing was deduplicated)."""
+    return dedup.get("rows", 0) / dedup["scored"] if dedup.get("scored") else 1.0
+
+
+def bucket_risk(probs):
+    """Map probabilities to the Low / Medium / High risk buckets."""
+    # include_lowest: float32 engines can return exactly 0.0 for very safe customers
+    return pd.cut(probs, bins=RISK_BINS, labels=RISK_LABELS, include_lowest=True)
+
+
+def predict_columns(model, scaler, columns, out=None, imputed=None, dedup=None, unknown=None):
+    """Churn probabilities for the rows of a DataFrame or dict of column arrays.
+
+    Blank inputs are filled with the scaler's training medians; with a dict
+    `imputed`, the number of values filled per column is added to it, and
+    with a dict `unknown` the categorical values that are not a training
+    level (see `scale`). Only distinct rows are run through the model (see
+    `predict_unique`, which also explains `dedup`).
+    """
+    X_scaled = scale(scaler, columns, out=out, unknown=unknown)
+    counts = impute(X_scaled, scaled_fill_values(scaler))
+    if imputed is not None:
+        add_counts(imputed, input_features(scaler), counts)
+    return predict_unique(model, X_scaled, dedup)
+
+
+def score_frame(model, scaler, df, out=None, imputed=None, dedup=None, unknown=None):
+    """Add Churn_Probability and Churn_Risk columns to `df` in place.
+
+    Scored as in `predict_columns`, which also explains `imputed`, `dedup`
+    and `unknown`.
+    """
+    probs = predict_columns(model, scaler, df, out=out, imputed=imputed, dedup=dedup,
+                            unknown=unknown)
+    df["Churn_Probability"] = probs
+    df["Churn_Risk"] = bucket_risk(probs)
+    return df
+
+
+def risk_counts(df):
+    """Count rows per risk bucket, including empty buckets."""
+    counts = df["Churn_Risk"].value_counts()
+    return {label: int(counts.get(label, 0)) for label in RISK_LABELS}
+
+
+def risk_counts_from_probs(probs):
+    """Per-bucket counts straight from probabilities (same bins as bucket_risk)."""
+    # pd.cut bins are right-closed: bucket i holds RISK_BINS[i] < p <= RISK_BINS[i + 1],
+    # and the first one also holds p == 0
+    idx = np.searchsorted(RISK_BINS[1:], probs, side="left")
+    counts = np.bincount(idx, minlength=len(RISK_BINS))[:len(RISK_LABELS)]
+    return {label: int(n) for label, n in zip(RISK_LABELS, counts)}
+
+
+def content_hash(fileobj, block_size=1 << 20):
+    """SHA-256 of a binary file object's contents; leaves it rewound."""
+    h = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(block_size), b""):
+        h.update(block)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+
+def scaling_buffer(scaler, rows):
+    """Reusable float32 scaling buffer for a FusedScaler, otherwise None."""
+    if isinstance(scaler, preprocessing.FusedScaler):
+        return np.empty((rows, scaler.n_features_in_), dtype=np.float32)
+    return None
+
+
+def buffer_rows(buffer, n):
+    """The first `n` rows of a scaling buffer (or None without one)."""
+    return None if buffer is None else buffer[:n]
+
+
+def score_csv_in_chunks(model, scaler, source, out_path, chunk_rows=CHUNK_ROWS,
+                        on_chunk=None, preview_rows=0):
+    """Stream `source` through scaler + model and append results to `out_path`.
+
+    Only one chunk of `chunk_rows` rows is held in memory at a time, so peak
+    memory does not grow with the size of the input. `on_chunk(rows_done)`
+    is called after each chunk has been written. Returns the number of rows
+    scored, the per-bucket counts, the first `preview_rows` scored rows, all
+    probabilities as one float32 array (4 bytes per row), the number of
+    blank values filled per column, the `predict_unique` row counts and the
+    number of unknown categorical values per column.
+
+    A model with a `score_csv` method (`parallel.ParallelScorer`) is handed
+    the whole job, and parses and scores several chunks at once.
+    """
+    if hasattr(model, "score_csv"):
+        return model.score_csv(source, out_path, chunk_rows, on_chunk, preview_rows)
+    rows_done = 0
+    totals = dict.fromkeys(RISK_LABELS, 0)
+    imputed = {}
+    dedup = {}
+    unknown = {}
+    preview = None
+    probs = []
+    buffer = scaling_buffer(scaler, chunk_rows)
+
+    with open(out_path, "w", newline="") as out:
+        for i, chunk in enumerate(pd.read_csv(source, chunksize=chunk_rows)):
+            score_frame(model, scaler, chunk, out=buffer_rows(buffer, len(chunk)),
+                        imputed=imputed, dedup=dedup, unknown=unknown)
+            chunk.to_csv(out, header=(i == 0), index=False)
+            probs.append(chunk["Churn_Probability"].to_numpy(dtype=np.float32))
+
+            for label, count in risk_counts(chunk).items():
+                totals[label] += count
+            if preview is None and preview_rows:
+                preview = chunk.head(preview_rows)
+
+            rows_done += len(chunk)
+            if on_chunk is not None:
+                on_chunk(rows_done)
+
+    probs = np.concatenate(probs) if probs else np.empty(0, dtype=np.float32)
+    return rows_done, totals, preview, probs, imputed, dedup, unknown
+
+
+def score_store(model, scaler, store, chunk_rows=CHUNK_ROWS, imputed=None, dedup=None,
+                start=0, stop=None, unknown=None):
+    """Churn probabilities for rows [start, stop) of a feature store, as one array.
+
+    The scaler's input columns are read as memory-mapped slices (categorical
+    columns as dictionary codes, see `feature_store.FeatureStore.slices`);
+    with a FusedScaler they are scaled straight into a reused float32 buffer,
+    so no DataFrame is built on the way in. Blanks and duplicate rows are
+    handled, and `imputed` / `dedup` / `unknown` counted, as in `predict_columns`.
+    """
+    stop = store.rows if stop is None else stop
+    probs = np.empty(stop - start, dtype=np.float32)
+    buffer = scaling_buffer(scaler, min(chunk_rows, stop - start))
+    columns = input_columns(scaler, store.columns)
+    for lo, hi, view in store.slices(columns, chunk_rows, start, stop):
+        probs[lo - start:hi - start] = predict_columns(
+            model, scaler, view, out=buffer_rows(buffer, hi - lo), imputed=imputed, dedup=dedup,
+            unknown=unknown,
+        )
+    return probs
@@ -0,0 +1,435 @@
+"""Pickle-free, fused feature scaling.
+
+The apps ship fitted sklearn `StandardScaler` pickles. Unpickling them is slow
+and unsafe, and every `scaler.transform` call pays for sklearn's input
+validation. `export_scaler` writes the scaler's mean/scale to a small JSON file
+in the same layout as `ai-retention-radar/config/preprocessing_config.json`,
+and `FusedScaler` applies it with NumPy directly into a preallocated float32
+buffer that the NumPy engine consumes without another copy. The JSON also
+carries the training medians (``numeric_medians``) that bulk scoring fills
+blank inputs with, and for each one-hot encoded column the training levels
+without a column of their own (``baseline_levels``, dropped by
+``get_dummies(drop_first=True)``), so that levels never seen in training can
+be told apart from the baseline and counted.
+
+The 29-input models were trained on one-hot columns (`Gender_Male`, ...)
+while exports carry the raw strings. `CategoricalEncoder` is compiled once
+from the scaler's feature names into per-column lookup tables and maps raw
+string columns into that exact layout in one vectorized pass per column.
+For models that take a categorical column as one integer level code instead
+(`churn_serving.sparse_input`), it writes those codes with the same lookup.
+
+Export from the command line (from the repository root)::
+
+    python -m churn_serving.preprocessing Churn-Prediction1/scaler_business.pkl \
+        --medians-from ai-retention-radar/sample_data/train_web.csv
+"""
+
+import argparse
+import functools
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+class FusedScaler:
+    """StandardScaler-compatible `(x - mean) / scale` in float32.
+
+    Exposes `n_features_in_` / `feature_names_in_` and a `transform` method
+    like the sklearn scaler, so it can be used wherever the pickle was.
+    """
+
+    def __init__(self, feature_names, mean, scale, fill_values=None, categories=None,
+                 baseline_levels=None):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.mean_ = np.asarray(mean, dtype=np.float32)
+        self.scale_ = np.asarray(scale, dtype=np.float32)
+        # Features with zero variance are left unscaled, as in sklearn
+        self._inv_scale = np.where(self.scale_ == 0, 1, 1 / self.scale_).astype(np.float32)
+        self.n_features_in_ = len(self.mean_)
+        # Pass-through scalers (see `identity`) only convert to float32
+        self._identity = not self.mean_.any() and bool(np.all(self._inv_scale == 1))
+        # Raw values for blank inputs, by feature name (see `fit_fill_values`)
+        self.fill_values_ = dict(fill_values or {})
+        # Inputs that are categorical level codes: name -> levels (code i + 1 is
+        # levels[i], 0 any other level); see `CategoricalEncoder`
+        self.categories_ = {name: list(levels) for name, levels in (categories or {}).items()}
+        # Training levels of raw categorical columns that encode as all zeros
+        # (see `fit_baseline_levels`), by column
+        self.baseline_levels_ = {
+            name: list(levels) for name, levels in (baseline_levels or {}).items()
+        }
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        names = getattr(scaler, "feature_names_in_", None)
+        if names is None:
+            names = [f"x{i}" for i in range(scaler.n_features_in_)]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)
+        scale = scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)
+        return cls(names, mean, scale)
+
+    @classmethod
+    def identity(cls, feature_names, fill_values=None, categories=None):
+        """A scaler that only converts to float32, for models with scaling built in."""
+        n = len(feature_names)
+        return cls(feature_names, np.zeros(n), np.ones(n), fill_values, categories)
+
+    @classmethod
+    def from_config(cls, config):
+        names = config["numeric_cols"]
+        return cls(
+            names,
+            [config["numeric_means"][n] for n in names],
+            [config["numeric_stds"][n] for n in names],
+            config.get("numeric_medians"),
+            config.get("categorical_levels"),
+            config.get("baseline_levels"),
+        )
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            return cls.from_config(json.load(f))
+
+    def to_config(self):
+        names = [str(n) for n in self.feature_names_in_]
+        config = {
+            "numeric_cols": names,
+            "numeric_means": {n: float(m) for n, m in zip(names, self.mean_)},
+            "numeric_stds": {n: float(s) for n, s in zip(names, self.scale_)},
+        }
+        if self.fill_values_:
+            config["numeric_medians"] = {n: float(v) for n, v in self.fill_values_.items()}
+        if self.categories_:
+            config["categorical_levels"] = self.categories_
+        if self.baseline_levels_:
+            config["baseline_levels"] = self.baseline_levels_
+        return config
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_config(), f, indent=2)
+
+    def transform(self, X, out=None):
+        """Scale `X` into `out` (a float32 (n, features) buffer, allocated if None).
+
+        DataFrames (and dicts of column arrays, such as feature store slices)
+        are read column by column straight into `out`, so no intermediate
+        float64 matrix is built.
+        """
+        columnar = isinstance(X, (pd.DataFrame, dict))
+        n = len(next(iter(X.values()))) if isinstance(X, dict) else len(X)
+        if out is None:
+            out = np.empty((n, self.n_features_in_), dtype=np.float32)
+        elif out.shape != (n, self.n_features_in_) or out.dtype != np.float32:
+            raise ValueError(f"out must be float32 with shape {(n, self.n_features_in_)}")
+
+        if self._identity:
+            if columnar:
+                for j, name in enumerate(self.feature_names_in_):
+                    out[:, j] = X[name]
+            else:
+                out[...] = X
+            return out
+
+        if columnar:
+            for j, name in enumerate(self.feature_names_in_):
+                column = np.asarray(X[name])
+                np.subtract(column, self.mean_[j], out=out[:, j], casting="same_kind")
+        else:
+            np.subtract(np.asarray(X), self.mean_, out=out, casting="same_kind")
+        out *= self._inv_scale
+        return out
+
+    def inverse_transform(self, X):
+        """Map scaled features back to raw ones."""
+        return np.asarray(X, dtype=np.float32) / self._inv_scale + self.mean_
+
+
+class CategoricalEncoder:
+    """Raw categorical columns -> the one-hot columns of a scaler's layout.
+
+    Feature names of the form ``Column_Level`` (as written by
+    `pd.get_dummies`) form one group per raw column. Each group keeps a
+    dictionary from level to one-hot slot; `encode` dictionary-codes a chunk's
+    column (pandas categorical codes, or `pd.factorize` for strings), maps the
+    few distinct values through that dictionary and sets the ones with a
+    single fancy-indexed assignment. Levels without a column of their own (the
+    dropped baseline, unseen levels, blanks) encode as all zeros, exactly like
+    `pd.get_dummies(...).reindex(columns=names, fill_value=0)`.
+
+    Columns listed in `categories` (name -> levels) are encoded as a single
+    integer code instead: i + 1 for levels[i] and 0 for anything else, i.e.
+    the index of the one-hot slot that would be set. Such a code can also be
+    taken from input that is already one-hot (``Column_Level`` columns).
+
+    For columns with `baseline_levels` (column -> levels that legitimately
+    encode as zeros), `encode` counts the non-blank values that are neither
+    a level nor a baseline, such as unseen levels or numeric codes.
+    """
+
+    def __init__(self, feature_names, categories=None, baseline_levels=None):
+        self.feature_names = [str(n) for n in feature_names]
+        self.baselines = {
+            column: {str(level) for level in levels}
+            for column, levels in (baseline_levels or {}).items()
+        }
+        # raw column -> {level: code} for columns taken as level codes
+        self.indexed = {
+            column: {str(level): code for code, level in enumerate(levels, 1)}
+            for column, levels in (categories or {}).items()
+        }
+        # raw column -> {level: slot}, slots indexing the one-hot block
+        self.groups = {}
+        self.onehot_names = []
+        for name in self.feature_names:
+            column, sep, level = name.partition("_")
+            if sep and name not in self.indexed:
+                self.groups.setdefault(column, {})[level] = len(self.onehot_names)
+                self.onehot_names.append(name)
+        self._onehot = {name: slot for slot, name in enumerate(self.onehot_names)}
+        # raw column -> its one-hot column names, for level codes given one-hot
+        self._indexed_onehot = {
+            column: [f"{column}_{level}" for level in levels]
+            for column, levels in (categories or {}).items()
+        }
+
+    def needs_encoding(self, columns):
+        """True if `columns` has raw categorical columns instead of the one-hot ones."""
+        if self.indexed:
+            return True
+        columns = set(columns)
+        return any(name not in columns for name in self.onehot_names)
+
+    def missing_columns(self, columns):
+        """Inputs not available from `columns`; a raw column stands for its group."""
+        columns = set(columns)
+        missing = []
+        for name in self.feature_names:
+            if name in columns:
+                continue
+            if name in self._onehot:
+                name = name.partition("_")[0]
+                if name in columns or name in missing:
+                    continue
+            elif name in self.indexed and columns.issuperset(self._indexed_onehot[name]):
+                continue
+            missing.append(name)
+        return missing
+
+    def input_columns(self, columns):
+        """The columns of `columns` that `encode` reads, in their order."""
+        inputs = set(self.feature_names) | set(self.groups) | set(self.indexed)
+        for names in self._indexed_onehot.values():
+            inputs.update(names)
+        return [c for c in columns if c in inputs]
+
+    def _lookup(self, values, mapping, default, dtype=np.intp, baseline=None):
+        # Dictionary-code the column, then look up only its distinct values;
+        # with a `baseline` set, also count the values that are neither
+        # mapped nor in it (blanks are not counted)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.array if isinstance(values, pd.Series) else values
+            codes, uniques = np.asarray(values.codes), values.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        levels = [str(u) for u in uniques]
+        table = np.array([mapping.get(u, default) for u in levels] + [default], dtype=dtype)
+        unknown = 0
+        if baseline is not None:
+            other = np.array([u not in mapping and u not in baseline for u in levels] + [False])
+            if other.any():
+                unknown = int(np.count_nonzero(other[codes]))
+        # Code -1 (blank) picks the trailing entry of the tables
+        return table[codes], unknown
+
+    def _count(self, unknown, column, count):
+        if unknown is not None and count:
+            unknown[column] = unknown.get(column, 0) + count
+
+    def encode(self, df, out=None, unknown=None):
+        """Columns of `df` (a DataFrame or dict of columns) in the scaler layout, as a dict of arrays.
+
+        Numeric columns are passed through as they are; the one-hot columns
+        are views into `out` (a uint8 (n, len(onehot_names)) block, allocated
+        if None), so `FusedScaler.transform` reads them without another copy.
+        With a dict `unknown`, the number of unknown values per raw column
+        (see above) is added to it.
+        """
+        n = len(df[next(iter(df.keys()))])
+        if out is None:
+            out = np.zeros((n, len(self.onehot_names)), dtype=np.uint8)
+        else:
+            out[...] = 0
+        rows = np.arange(n)
+        for column, levels in self.groups.items():
+            baseline = self.baselines.get(column) if unknown is not None else None
+            slots, count = self._lookup(df[column], levels, -1, baseline=baseline)
+            self._count(unknown, column, count)
+            hit = slots >= 0
+            out[rows[hit], slots[hit]] = 1
+
+        encoded = {}
+        for name in self.feature_names:
+            if name in self._onehot:
+                encoded[name] = out[:, self._onehot[name]]
+            elif name in self.indexed and name not in df:
+                block = np.column_stack([np.asarray(df[c]) for c in self._indexed_onehot[name]])
+                encoded[name] = np.where(block.any(axis=1), block.argmax(axis=1) + 1, 0
+                                         ).astype(np.uint8)
+            elif name in self.indexed:
+                # Raw values, numbers included, are looked up like the one-hot
+                # groups; only codes derived from one-hot columns pass through
+                baseline = self.baselines.get(name) if unknown is not None else None
+                encoded[name], count = self._lookup(df[name], self.indexed[name], 0, np.uint8,
+                                                    baseline)
+                self._count(unknown, name, count)
+            else:
+                encoded[name] = np.asarray(df[name])
+        return encoded
+
+
+@functools.lru_cache(maxsize=None)
+def categorical_encoder(feature_names, categories=(), baseline_levels=()):
+    """The compiled CategoricalEncoder for a tuple of feature names.
+
+    `categories` and `baseline_levels` are tuples of (column, levels tuple)
+    pairs, hashable for the cache.
+    """
+    return CategoricalEncoder(feature_names, dict(categories), dict(baseline_levels))
+
+
+def load_scaler(path):
+    """Load a scaler from an exported `.json` or from a sklearn pickle."""
+    if path.endswith(".json"):
+        return FusedScaler.from_json(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_fused_scaler(path):
+    """Like `load_scaler`, but always returns a FusedScaler."""
+    scaler = load_scaler(path)
+    if not isinstance(scaler, FusedScaler):
+        scaler = FusedScaler.from_sklearn(scaler)
+    return scaler
+
+
+def exported_scaler_path(scaler_path):
+    """The scaler's `.json` export (see `export_scaler`) if there is one, else `scaler_path`."""
+    json_path = os.path.splitext(scaler_path)[0] + ".json"
+    return json_path if os.path.exists(json_path) else scaler_path
+
+
+def _export_entry(scaler_path, key):
+    # An entry of the scaler's JSON export (`scaler_path` itself, or the
+    # `.json` next to a pickle); empty if there is none
+    json_path = os.path.splitext(scaler_path)[0] + ".json"
+    try:
+        with open(json_path) as f:
+            return json.load(f).get(key, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def load_fill_values(scaler_path):
+    """The training medians stored with a scaler, by feature name.
+
+    They live in the scaler's JSON export (`scaler_path` itself, or the
+    `.json` next to a pickle); empty if there is none.
+    """
+    return _export_entry(scaler_path, "numeric_medians")
+
+
+def load_baseline_levels(scaler_path):
+    """The baseline levels stored with a scaler (see `fit_baseline_levels`), by column."""
+    return _export_entry(scaler_path, "baseline_levels")
+
+
+def with_training_stats(scaler, scaler_path):
+    """Give `scaler` the fill values and baseline levels of its JSON export if it lacks them."""
+    if not getattr(scaler, "fill_values_", None):
+        scaler.fill_values_ = load_fill_values(scaler_path)
+    if not getattr(scaler, "baseline_levels_", None):
+        scaler.baseline_levels_ = load_baseline_levels(scaler_path)
+    return scaler
+
+
+def fit_fill_values(feature_names, csv_path):
+    """Medians of the given features over a training CSV (features it lacks are skipped)."""
+    columns = set(pd.read_csv(csv_path, nrows=0).columns)
+    usecols = [str(n) for n in feature_names if n in columns]
+    medians = pd.read_csv(csv_path, usecols=usecols).median()
+    return {name: float(medians[name]) for name in usecols}
+
+
+def fit_baseline_levels(feature_names, csv_path):
+    """Per one-hot encoded column of a training CSV, its levels that have no feature.
+
+    That is the level ``get_dummies(drop_first=True)`` dropped; raw columns
+    the CSV lacks are skipped.
+    """
+    encoder = CategoricalEncoder(feature_names)
+    columns = set(pd.read_csv(csv_path, nrows=0).columns)
+    usecols = [column for column in encoder.groups if column in columns]
+    df = pd.read_csv(csv_path, usecols=usecols, dtype=str)
+    return {
+        column: sorted(set(df[column].dropna()) - set(encoder.groups[column]))
+        for column in usecols
+    }
+
+
+def export_scaler(scaler_path, out_path=None, medians_from=None):
+    """Write the mean/scale of a pickled StandardScaler to JSON; returns the path.
+
+    Fill values and baseline levels come from `medians_from` (a training
+    CSV) if given, otherwise those of an existing export are kept.
+    """
+    out_path = out_path or os.path.splitext(scaler_path)[0] + ".json"
+    with open(scaler_path, "rb") as f:
+        scaler = pickle.load(f)
+    fused = FusedScaler.from_sklearn(scaler)
+    if medians_from is not None:
+        fused.fill_values_ = fit_fill_values(fused.feature_names_in_, medians_from)
+        fused.baseline_levels_ = fit_baseline_levels(fused.feature_names_in_, medians_from)
+    else:
+        with_training_stats(fused, out_path)
+    fused.to_json(out_path)
+    return out_path
+
+
+def max_abs_diff(scaler_path, fused, rows=1024, seed=0):
+    """Largest difference between the pickled scaler and `fused` on random inputs."""
+    with open(scaler_path, "rb") as f:
+        scaler = pickle.load(f)
+    rng = np.random.default_rng(seed)
+    X = scaler.mean_ + rng.normal(size=(rows, fused.n_features_in_)) * scaler.scale_
+    expected = scaler.transform(pd.DataFrame(X, columns=fused.feature_names_in_))
+    return float(np.max(np.abs(expected - fused.transform(X))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.preprocessing",
+        description="Export pickled StandardScalers to JSON mean/scale arrays.",
+    )
+    parser.add_argument("scalers", nargs="+", help="pickled sklearn StandardScaler files")
+    parser.add_argument("--medians-from", metavar="CSV",
+                        help="training CSV whose column medians fill blank inputs at serve "
+                             "time, and whose categorical levels without a column are the baselines")
+    args = parser.parse_args(argv)
+
+    for scaler_path in args.scalers:
+        out_path = export_scaler(scaler_path, medians_from=args.medians_from)
+        diff = max_abs_diff(scaler_path, FusedScaler.from_json(out_path))
+        print(f"{scaler_path} -> {out_path} (max |sklearn - fused| = {diff:.2e})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""First-layer row gathers for the one-hot inputs of the 29-input models.
+
+16 of the 29 inputs are one-hot columns of five mutually exclusive groups
+(login device, payment mode, gender, order category, marital status). With
+the scaler folded into the first layer (see `churn_serving.fold_scaler`) a
+one-hot column is exactly 0 or 1, so a group's contribution to the first
+Dense layer is the kernel row of the level that is set, or nothing for the
+dropped baseline level. `SparseInputMLP` therefore takes each group as one
+integer level code (as written by `preprocessing.CategoricalEncoder`) and
+runs the dense matmul over the numeric inputs only. The groups' kernel rows
+(and the bias) are pre-summed for every combination of levels, 756 rows for
+these models, so each row adds a single row gathered from that table.
+
+Rows shrink from 29 to 18 inputs, and the first layer does 13 instead of 29
+multiply-adds per unit plus one gather. It is served as the
+``numpy-sparse`` engine of `churn_serving.backends` from the `.folded.npz`.
+Compare it with the dense folded model from the command line (from the
+repository root)::
+
+    python -m churn_serving.sparse_input --models deploy final
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from churn_serving import numpy_engine, preprocessing
+
+# Largest table of pre-summed level combinations; models with more
+# combinations gather one row per group instead
+MAX_COMBINED_ROWS = 4_096
+
+
+class SparseInputMLP:
+    """A folded NumpyMLP whose one-hot groups are given as level codes.
+
+    Inputs are the numeric features (raw values) followed by one code per
+    categorical column; `input_names` and `categories` describe that layout.
+    """
+
+    def __init__(self, folded):
+        if folded.input_scaler is None:
+            raise ValueError("Sparse inputs need a model with the scaler folded in")
+        names = [str(n) for n in folded.input_scaler["numeric_cols"]]
+        encoder = preprocessing.CategoricalEncoder(names)
+        kernel, bias, activation, activation_name = folded.layers[0]
+
+        onehot = set(encoder.onehot_names)
+        numeric = [j for j, name in enumerate(names) if name not in onehot]
+        self.numeric_names = [names[j] for j in numeric]
+        self.kernel = np.ascontiguousarray(kernel[numeric])
+        self.bias = bias
+        self.activation = activation
+        self.categories = {}
+        # Per categorical column: row 0 (no slot set) is zero, row i + 1 is
+        # the kernel row of level i
+        self.tables = []
+        for column, levels in encoder.groups.items():
+            self.categories[column] = list(levels)
+            table = np.zeros((len(levels) + 1, kernel.shape[1]), dtype=np.float32)
+            for code, level in enumerate(levels, 1):
+                table[code] = kernel[names.index(f"{column}_{level}")]
+            self.tables.append(table)
+        self.input_names = self.numeric_names + list(self.categories)
+        self.dense_input_names = names
+        self.rest = folded.layers[1:]
+
+        sizes = [len(table) for table in self.tables]
+        self._max_codes = np.array(sizes, dtype=np.intp) - 1
+        self.combined = None
+        if int(np.prod(sizes)) <= MAX_COMBINED_ROWS:
+            # Row sum(code_g * radix_g) = bias + the groups' rows for those codes
+            combined = bias[np.newaxis]
+            for table in self.tables:
+                combined = (combined[:, np.newaxis] + table[np.newaxis]).reshape(-1, len(bias))
+            self.combined = np.ascontiguousarray(combined, dtype=np.float32)
+            self._radix = np.array([np.prod(sizes[g + 1:]) for g in range(len(sizes))],
+                                   dtype=np.intp)
+
+    @property
+    def input_dim(self):
+        return len(self.input_names)
+
+    def forward(self, X):
+        """Run the network on (numeric..., codes...) rows; returns (n, units) float32."""
+        X = np.asarray(X, dtype=np.float32)
+        n = len(self.numeric_names)
+        codes = X[:, n:].astype(np.intp)
+        np.clip(codes, 0, self._max_codes, out=codes)
+        if self.combined is not None:
+            h = np.take(self.combined, codes @ self._radix, axis=0)
+            h += X[:, :n] @ self.kernel
+        else:
+            h = X[:, :n] @ self.kernel
+            h += self.bias
+            for g, table in enumerate(self.tables):
+                h += np.take(table, codes[:, g], axis=0)
+        h = self.activation(h)
+        for kernel, bias, activation, _ in self.rest:
+            h = h @ kernel
+            h += bias
+            h = activation(h)
+        return h
+
+    def predict(self, X, batch_size=None, verbose=0):
+        """Keras-compatible `predict`; `batch_size` and `verbose` are ignored."""
+        return self.forward(X)
+
+    __call__ = forward
+
+    def from_dense(self, X):
+        """Raw one-hot rows in the folded model's 29-column layout -> sparse rows."""
+        X = np.asarray(X, dtype=np.float32)
+        index = {name: j for j, name in enumerate(self.dense_input_names)}
+        out = np.empty((len(X), self.input_dim), dtype=np.float32)
+        for i, name in enumerate(self.numeric_names):
+            out[:, i] = X[:, index[name]]
+        n = len(self.numeric_names)
+        for g, (column, levels) in enumerate(self.categories.items()):
+            block = X[:, [index[f"{column}_{level}"] for level in levels]]
+            out[:, n + g] = np.where(block.any(axis=1), block.argmax(axis=1) + 1, 0)
+        return out
+
+    def random_dense(self, X, rng):
+        """Copy of raw 29-column rows `X` with every group set to a random valid level."""
+        X = np.array(X, dtype=np.float32)
+        index = {name: j for j, name in enumerate(self.dense_input_names)}
+        rows = np.arange(len(X))
+        for column, levels in self.categories.items():
+            columns = np.array([index[f"{column}_{level}"] for level in levels])
+            X[:, columns] = 0
+            codes = rng.integers(0, len(levels) + 1, size=len(X))
+            hit = codes > 0
+            X[rows[hit], columns[codes[hit] - 1]] = 1
+        return X
+
+
+def first_layer_flops(n_inputs, units):
+    """Multiply-adds of a dense first layer."""
+    return n_inputs * units
+
+
+def _timed_forward(model, X, chunk_rows):
+    start = time.perf_counter()
+    out = np.concatenate([
+        model.forward(X[i:i + chunk_rows]) for i in range(0, len(X), chunk_rows)
+    ])
+    return len(X) / (time.perf_counter() - start), out
+
+
+def compare(folded, rows=100_000, chunk_rows=4_096, seed=0):
+    """Max |dense - sparse| and the rows/s of both on the same random customers.
+
+    Both run over `chunk_rows`-row chunks, as in bulk scoring.
+    """
+    sparse = SparseInputMLP(folded)
+    scaler = preprocessing.FusedScaler.from_config(folded.input_scaler)
+    rng = np.random.default_rng(seed)
+    raw = scaler.inverse_transform(rng.normal(size=(rows, folded.input_dim)))
+    dense_X = sparse.random_dense(raw, rng)
+    sparse_X = sparse.from_dense(dense_X)
+
+    timings = {}
+    for label, model, X in (("dense", folded, dense_X), ("sparse", sparse, sparse_X)):
+        model.forward(X[:chunk_rows])
+        timings[label] = _timed_forward(model, X, chunk_rows)
+    units = folded.layers[0][0].shape[1]
+    return {
+        "max_abs_diff": float(np.max(np.abs(timings["dense"][1] - timings["sparse"][1]))),
+        "dense_rows_per_s": timings["dense"][0],
+        "sparse_rows_per_s": timings["sparse"][0],
+        "dense_inputs": folded.input_dim,
+        "sparse_inputs": sparse.input_dim,
+        "dense_first_layer_flops": first_layer_flops(folded.input_dim, units),
+        "sparse_first_layer_flops": first_layer_flops(len(sparse.numeric_names), units),
+    }
+
+
+def main(argv=None):
+    from churn_serving import backends, models
+
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.sparse_input",
+        description="Compare the folded models with one-hot groups as dense inputs and as codes.",
+    )
+    parser.add_argument("--models", nargs="+", default=["deploy", "final"],
+                        choices=list(models.MODELS))
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-rows", type=int, default=4_096)
+    args = parser.parse_args(argv)
+
+    for name in args.models:
+        spec = models.get_spec(name)
+        folded = numpy_engine.load(backends.artifact_path(spec.model_path, "numpy-folded"))
+        r = compare(folded, args.rows, args.chunk_rows)
+        print(f"{name}: max |dense - sparse| = {r['max_abs_diff']:.2e}")
+        print(f"  inputs per row {r['dense_inputs']} -> {r['sparse_inputs']}, "
+              f"first-layer multiply-adds {r['dense_first_layer_flops']} -> "
+              f"{r['sparse_first_layer_flops']}")
+        print(f"  {r['dense_rows_per_s']:,.0f} -> {r['sparse_rows_per_s']:,.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
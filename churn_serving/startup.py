@@ -0,0 +1,139 @@
+"""Fast, process-wide model start-up for the churn apps.
+
+`preload` starts importing TensorFlow, loading the model/scaler and running a
+warm-up prediction on a background thread and returns immediately, so a
+Streamlit page can render while the model is still coming up. `get` waits
+for that work to finish. Loaded models are cached per (model, scaler path,
+engine) for the life of the process (or until an artifact changes on disk), so
+Streamlit reruns and multiple sessions share one copy, and the first real
+request never pays for graph tracing. The engine defaults to the
+`CHURN_ENGINE` environment variable (see `churn_serving.backends`).
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from churn_serving import backends, cache, pipeline
+
+logger = logging.getLogger(__name__)
+
+# Batch sizes predicted once at start-up so their graphs are already traced
+WARMUP_BATCH_SIZES = (1,)
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+class WarmModel:
+    """A loaded model/scaler pair plus how long each start-up step took."""
+
+    def __init__(self, model, scaler, timings):
+        self.model = model
+        self.scaler = scaler
+        self.timings = timings
+
+    def describe(self):
+        return ", ".join(f"{step} {seconds:.2f}s" for step, seconds in self.timings.items())
+
+
+def _import_backend(engine):
+    if engine not in backends.TF_ENGINES or "tensorflow" in sys.modules:
+        return
+    import tensorflow  # noqa: F401
+
+
+def _warm_up(model, scaler, batch_sizes):
+    n_features = scaler.n_features_in_
+    names = getattr(scaler, "feature_names_in_", None)
+    for batch_size in batch_sizes:
+        X = np.zeros((batch_size, n_features), dtype=np.float32)
+        if names is not None:
+            import pandas as pd
+
+            X = pd.DataFrame(X, columns=names)
+        model.predict(scaler.transform(X), batch_size=batch_size, verbose=0)
+
+
+def _load(model_path, scaler_path, batch_sizes, engine):
+    timings = {}
+
+    start = time.perf_counter()
+    _import_backend(engine)
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model, scaler = pipeline.load_model_and_scaler(model_path, scaler_path, engine)
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _warm_up(model, scaler, batch_sizes)
+    timings["warm-up"] = time.perf_counter() - start
+
+    warm = WarmModel(model, scaler, timings)
+    logger.info("%s (%s) ready: %s", os.path.basename(model_path), engine, warm.describe())
+    return warm
+
+
+def _key(model_path, scaler_path, engine):
+    # Includes size/mtime so that replacing an artifact on disk loads it afresh
+    try:
+        fingerprint = cache.artifact_fingerprint(
+            pipeline.artifact_paths(model_path, scaler_path, engine)
+        )
+    except OSError:
+        fingerprint = None
+    return os.path.abspath(model_path), os.path.abspath(scaler_path), engine, fingerprint
+
+
+def _run(future, model_path, scaler_path, batch_sizes, engine):
+    try:
+        future.set_result(_load(model_path, scaler_path, batch_sizes, engine))
+    except BaseException as exc:
+        logger.exception("Failed to load %s with the %s engine", model_path, engine)
+        # Let the next preload() retry instead of caching the failure
+        with _lock:
+            _loaded.pop(_key(model_path, scaler_path, engine), None)
+        future.set_exception(exc)
+
+
+def preload(model_path, scaler_path, batch_sizes=WARMUP_BATCH_SIZES, engine=None):
+    """Start loading and warming up a model in the background; returns a Future.
+
+    Calling it again for the same paths and engine returns the same Future,
+    so this is cheap to call at the top of every Streamlit rerun.
+    """
+    engine = backends.resolve_engine(model_path, engine)
+    key = _key(model_path, scaler_path, engine)
+    with _lock:
+        future = _loaded.get(key)
+        if future is None:
+            # Forget models loaded from earlier versions of these files
+            for stale in [k for k in _loaded if k[:3] == key[:3]]:
+                del _loaded[stale]
+            future = Future()
+            _loaded[key] = future
+            threading.Thread(
+                target=_run,
+                args=(future, model_path, scaler_path, tuple(batch_sizes), engine),
+                name=f"preload-{os.path.basename(model_path)}",
+                daemon=True,
+            ).start()
+    return future
+
+
+def get(model_path, scaler_path, batch_sizes=WARMUP_BATCH_SIZES, timeout=None, engine=None):
+    """Return the warmed-up WarmModel for these paths, loading it if needed."""
+    return preload(model_path, scaler_path, batch_sizes, engine).result(timeout)
+
+
+def is_ready(model_path, scaler_path, engine=None):
+    """True once the model for these paths has finished loading successfully."""
+    engine = backends.resolve_engine(model_path, engine)
+    future = _loaded.get(_key(model_path, scaler_path, engine))
+    return future is not None and future.done() and future.exception() is None
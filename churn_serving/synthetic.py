@@ -0,0 +1,195 @@
+"""Synthetic customers for scale testing.
+
+The bundled datasets top out at a few thousand rows. `generate` samples any
+number of customers in the layout of `ai-retention-radar/sample_data`:
+numeric columns are drawn from the means and standard deviations in
+`ai-retention-radar/config/preprocessing_config.json`, clipped to the range
+seen in `train_web.csv` and rounded where the column is integer-valued
+(binary columns are Bernoulli draws on their mean); categorical columns
+follow their level frequencies in `train_web.csv`; and blanks appear at the
+observed per-column missing rates. Columns are sampled independently, and
+the optional `Churn` label only matches the overall churn rate, so the data
+is for load testing, not for judging model quality.
+
+Rows are generated in vectorized chunks and written as CSV (with pyarrow's
+CSV writer when installed), Parquet or a `churn_serving.feature_store`
+directory, chosen by the output path. Example (from the repository root)::
+
+    python -m churn_serving.synthetic customers_10m.parquet --rows 10000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import feature_store, models
+
+CONFIG_PATH = os.path.join(models.ROOT_DIR, "ai-retention-radar", "config",
+                           "preprocessing_config.json")
+TRAIN_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "train_web.csv")
+CHUNK_ROWS = 1_000_000
+FIRST_ID = 50_001
+
+
+def build_profile(config_path=CONFIG_PATH, train_csv=TRAIN_CSV):
+    """Per-column sampling parameters from the preprocessing config and sample data."""
+    with open(config_path) as f:
+        config = json.load(f)
+    df = pd.read_csv(train_csv)
+    target, id_col = config["target"], config["id_col"]
+
+    numeric = {}
+    for name in config["numeric_cols"]:
+        values = df[name].dropna()
+        if values.isin([0, 1]).all():
+            kind = "binary"
+        elif (values == values.round()).all():
+            kind = "integer"
+        else:
+            kind = "float"
+        numeric[name] = {
+            "kind": kind,
+            "mean": float(config["numeric_means"][name]),
+            "std": float(config["numeric_stds"][name]),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "missing": float(df[name].isna().mean()),
+        }
+
+    categorical = {}
+    skip = {target, id_col, *numeric}
+    for name in df.columns:
+        if name in skip or pd.api.types.is_numeric_dtype(df[name]):
+            continue
+        freq = df[name].value_counts(normalize=True, dropna=False)
+        categorical[name] = {
+            "levels": [str(level) for level in freq.index],
+            "p": freq.to_numpy(dtype=np.float64),
+        }
+
+    return {
+        "columns": [c for c in df.columns if c != target],
+        "id_col": id_col,
+        "target": target,
+        "churn_rate": float(df[target].mean()),
+        "numeric": numeric,
+        "categorical": categorical,
+    }
+
+
+def _numeric_column(rng, spec, rows, missing):
+    if spec["kind"] == "binary":
+        values = (rng.random(rows) < spec["mean"]).astype(np.float64)
+    else:
+        values = rng.normal(spec["mean"], spec["std"], size=rows)
+        np.clip(values, spec["min"], spec["max"], out=values)
+        if spec["kind"] == "integer":
+            np.round(values, out=values)
+        else:
+            np.round(values, 2, out=values)
+    if missing and spec["missing"] > 0:
+        values[rng.random(rows) < spec["missing"]] = np.nan
+    elif spec["kind"] != "float":
+        return values.astype(np.int64)
+    return values
+
+
+def generate(profile, rows, rng, start_id=FIRST_ID, label=False, missing=True):
+    """One DataFrame of `rows` synthetic customers in the sample-data column order."""
+    data = {}
+    for name in profile["columns"]:
+        if name == profile["id_col"]:
+            data[name] = np.arange(start_id, start_id + rows, dtype=np.int64)
+        elif name in profile["numeric"]:
+            data[name] = _numeric_column(rng, profile["numeric"][name], rows, missing)
+        else:
+            spec = profile["categorical"][name]
+            codes = rng.choice(len(spec["levels"]), size=rows, p=spec["p"]).astype(np.int8)
+            data[name] = pd.Categorical.from_codes(codes, spec["levels"])
+    if label:
+        data[profile["target"]] = (rng.random(rows) < profile["churn_rate"]).astype(np.int64)
+    return pd.DataFrame(data)
+
+
+class ArrowCsvWriter:
+    """Append chunks to a CSV with pyarrow's writer, far faster than `DataFrame.to_csv`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._writer = pa_csv.CSVWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_writer(path):
+    from churn_serving import cli
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            return cli.ChunkWriter(path)
+        return ArrowCsvWriter(path)
+    if ext in (".parquet", ".pq"):
+        return cli.ChunkWriter(path)
+    return feature_store.StoreWriter(path, source="synthetic")
+
+
+def write(path, rows, chunk_rows=CHUNK_ROWS, seed=0, label=False, missing=True,
+          profile=None, start_id=FIRST_ID):
+    """Generate `rows` customers chunk by chunk into `path`; returns seconds taken."""
+    profile = profile or build_profile()
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    with _open_writer(path) as writer:
+        for offset in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - offset)
+            writer.write(generate(profile, n, rng, start_id + offset, label, missing))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.synthetic",
+        description="Write synthetic customers (CSV, Parquet or feature store) for load testing.",
+    )
+    parser.add_argument("output", help=".csv, .parquet/.pq, or a feature store directory")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", action="store_true", help="add a Churn column")
+    parser.add_argument("--no-missing", action="store_true", help="never leave values blank")
+    args = parser.parse_args(argv)
+
+    elapsed = write(args.output, args.rows, args.chunk_rows, args.seed, args.label,
+                    missing=not args.no_missing)
+    print(f"{args.rows:,} rows -> {args.output} in {elapsed:.1f}s "
+          f"({args.rows / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Post-training int8 quantization of the churn models to TFLite.
+
+`export_tflite` converts a Keras model with the TFLite converter, using rows
+of `ai-retention-radar/sample_data/train_web.csv` (encoded and scaled as the
+model expects) as the representative dataset, so every op runs in int8 while
+the model keeps float32 inputs and outputs. The result is served by the
+``tflite`` engine of `churn_serving.backends` with only the standalone
+TFLite interpreter (see `requirements-tflite.txt`); pair it with the exported
+`.json` scaler to keep sklearn out as well.
+
+`evaluate` reports what quantization costs and saves: ROC AUC of the float
+and int8 models on the labelled sample data, and, each measured in a fresh
+process, peak memory and latency of the float Keras model against the int8
+interpreter. Example (from the repository root)::
+
+    python -m churn_serving.tflite_export --models business deploy final
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn_serving import backends, models, numpy_engine, pipeline, preprocessing
+
+TRAIN_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "train_web.csv")
+LABEL = "Churn"
+# Rows the converter runs through the model to calibrate activation ranges
+CALIBRATION_ROWS = 500
+FOOTPRINT_ITERS = 200
+FOOTPRINT_ROWS = 100_000
+
+
+def load_sample(spec, csv_path=TRAIN_CSV):
+    """Scaled model inputs (float32) and churn labels of the labelled sample data.
+
+    Categorical columns are one-hot encoded into the scaler's column layout
+    for the 29-input models; missing values are filled with column medians.
+    """
+    df = pd.read_csv(csv_path)
+    scaler = preprocessing.load_fused_scaler(spec.scaler_path)
+    encoder = preprocessing.categorical_encoder(tuple(scaler.feature_names_in_))
+    X = pd.DataFrame(encoder.encode(df), dtype=np.float64)
+    X = X.fillna(X.median())
+    return scaler.transform(X), df[LABEL].to_numpy()
+
+
+def export_tflite(spec, out_path=None, calibration_rows=CALIBRATION_ROWS, seed=0):
+    """Write an int8-quantized `.tflite` of `spec`'s model; returns the output path."""
+    import tensorflow as tf
+
+    out_path = out_path or backends.artifact_path(spec.model_path, "tflite")
+    model = tf.keras.models.load_model(spec.model_path, compile=False)
+    X, _ = load_sample(spec)
+    rng = np.random.default_rng(seed)
+    calibration = X[rng.permutation(len(X))[:calibration_rows]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: ([row[np.newaxis]] for row in calibration)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def roc_auc(y, scores):
+    from sklearn.metrics import roc_auc_score
+
+    return float(roc_auc_score(y, scores))
+
+
+def footprint(model_path, engine, iters=FOOTPRINT_ITERS, rows=FOOTPRINT_ROWS):
+    """Load time, peak RSS and latency of one engine; meant to run in its own process."""
+    from churn_serving import benchmark
+
+    start = time.perf_counter()
+    backend = backends.load(model_path, engine, check_outputs=False)
+    load_s = time.perf_counter() - start
+
+    X = np.random.default_rng(0).normal(size=(rows, backend.input_dim)).astype(np.float32)
+    latencies = np.empty(iters)
+    for i in range(iters):
+        start = time.perf_counter()
+        backend.predict(X[i:i + 1], batch_size=1)
+        latencies[i] = time.perf_counter() - start
+    start = time.perf_counter()
+    for chunk_start in range(0, rows, pipeline.CHUNK_ROWS):
+        chunk = X[chunk_start:chunk_start + pipeline.CHUNK_ROWS]
+        backend.predict(chunk, batch_size=len(chunk))
+    return {
+        "load_s": load_s,
+        "peak_rss_mb": benchmark.peak_rss_mb(),
+        "single_row_p50_ms": 1000 * float(np.median(latencies)),
+        "rows_per_s": rows / (time.perf_counter() - start),
+    }
+
+
+def _footprint_in_new_process(model_path, engine):
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return pool.submit(footprint, model_path, engine).result()
+
+
+def evaluate(spec, tflite_path, measure_footprint=True):
+    """AUC of the float and int8 models on the sample data, plus their footprints."""
+    X, y = load_sample(spec)
+    reference = numpy_engine.load(spec.model_path)
+    quantized = backends.TFLiteBackend(tflite_path)
+    float_probs = pipeline.predict_proba(reference, X)
+    int8_probs = pipeline.predict_proba(quantized, X)
+
+    report = {
+        "float_auc": roc_auc(y, float_probs),
+        "int8_auc": roc_auc(y, int8_probs),
+        "max_abs_diff": float(np.max(np.abs(float_probs - int8_probs))),
+        "float_weights_kb": sum(k.nbytes + b.nbytes for k, b, _, _ in reference.layers) / 1024,
+        "int8_file_kb": os.path.getsize(tflite_path) / 1024,
+    }
+    report["auc_delta"] = report["int8_auc"] - report["float_auc"]
+    if measure_footprint:
+        report["float"] = _footprint_in_new_process(spec.model_path, "keras")
+        report["int8"] = _footprint_in_new_process(spec.model_path, "tflite")
+    return report
+
+
+def format_report(r):
+    lines = [
+        f"  AUC float {r['float_auc']:.4f}, int8 {r['int8_auc']:.4f} "
+        f"(delta {r['auc_delta']:+.4f}), max |float - int8| {r['max_abs_diff']:.3f}",
+        f"  size: float32 weights {r['float_weights_kb']:.0f} KiB, "
+        f"int8 .tflite {r['int8_file_kb']:.0f} KiB",
+    ]
+    if "float" in r:
+        for label, engine in (("float (keras)", "float"), ("int8 (tflite)", "int8")):
+            f = r[engine]
+            lines.append(
+                f"  {label:<14} load {f['load_s']:.2f}s, peak RSS {f['peak_rss_mb']:.0f} MB, "
+                f"single row p50 {f['single_row_p50_ms']:.3f} ms, {f['rows_per_s']:,.0f} rows/s"
+            )
+        f, q = r["float"], r["int8"]
+        lines.append(
+            f"  savings: {f['peak_rss_mb'] - q['peak_rss_mb']:.0f} MB peak RSS, "
+            f"{f['single_row_p50_ms'] / q['single_row_p50_ms']:.1f}x single-row latency"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m churn_serving.tflite_export",
+        description="Quantize the churn models to int8 TFLite and report the trade-off.",
+    )
+    parser.add_argument("--models", nargs="+", default=list(models.MODELS),
+                        choices=list(models.MODELS))
+    parser.add_argument("--calibration-rows", type=int, default=CALIBRATION_ROWS,
+                        help=f"representative rows from train_web.csv (default: {CALIBRATION_ROWS})")
+    parser.add_argument("--skip-footprint", action="store_true",
+                        help="only report AUC and size, not memory and latency")
+    args = parser.parse_args(argv)
+
+    for name in args.models:
+        spec = models.get_spec(name)
+        out_path = export_tflite(spec, calibration_rows=args.calibration_rows)
+        print(f"{name}: {os.path.relpath(out_path, models.ROOT_DIR)}", flush=True)
+        report = evaluate(spec, out_path, measure_footprint=not args.skip_footprint)
+        print(format_report(report), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
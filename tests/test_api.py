@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from churn_serving import api, backends, models, pipeline, preprocessing
+
+SCORING_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "scoring_web.csv")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # NumPy engine: same weights as Keras, without starting TensorFlow
+    monkeypatch.setenv(backends.ENGINE_ENV, "numpy")
+    return TestClient(api.app)
+
+
+def raw_rows(n=5):
+    return pd.read_csv(SCORING_CSV).dropna().head(n).reset_index(drop=True)
+
+
+def request_rows(spec, raw):
+    """Raw export rows in the model's published input schema."""
+    onehot = pd.get_dummies(raw).reindex(columns=spec.features, fill_value=0)
+    return [{k: float(v) for k, v in row.items()} for row in onehot.to_dict("records")]
+
+
+def expected_probs(spec, raw):
+    model, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, "numpy")
+    return pipeline.score_frame(model, scaler, raw.copy())["Churn_Probability"].to_numpy()
+
+
+def test_features_are_the_scaler_columns():
+    for spec in models.MODELS.values():
+        _, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, "numpy")
+        assert spec.features == pipeline.input_features(scaler)
+    assert [name for name, _ in models.FEATURES_29] == models.get_spec("deploy").features
+
+
+@pytest.mark.parametrize("name", list(models.MODELS))
+def test_engines_without_tensorflow_need_no_sklearn(monkeypatch, name):
+    spec = models.get_spec(name)
+    monkeypatch.setitem(sys.modules, "sklearn", None)
+    _, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, "numpy")
+    assert isinstance(scaler, preprocessing.FusedScaler)
+    assert scaler.fill_values_
+
+
+@pytest.mark.parametrize("name", list(models.MODELS))
+def test_predict_matches_score_frame(client, name):
+    spec = models.get_spec(name)
+    raw = raw_rows()
+    rows = request_rows(spec, raw)
+    expected = expected_probs(spec, raw)
+
+    single = client.post(f"/models/{name}/predict", json={"features": rows[0]})
+    assert single.status_code == 200
+    assert single.json()["churn_probability"] == pytest.approx(expected[0], abs=1e-6)
+
+    batch = client.post(f"/models/{name}/predict/batch", json={"rows": rows})
+    assert batch.status_code == 200
+    probs = [p["churn_probability"] for p in batch.json()["predictions"]]
+    np.testing.assert_allclose(probs, expected, atol=1e-6)
+
+
+def test_unknown_and_missing_features_are_rejected(client):
+    spec = models.get_spec("deploy")
+    row = request_rows(spec, raw_rows(1))[0]
+    row.pop("Gender_Male")
+    row["Gender"] = 1.0
+    response = client.post("/models/deploy/predict", json={"features": row})
+    assert response.status_code == 422
+    assert response.json()["detail"] == {"row": 0, "missing": ["Gender_Male"], "unknown": ["Gender"]}
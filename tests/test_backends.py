@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+import pytest
+
+from churn_serving import backends, pipeline
+
+
+def test_tflite_predict_is_thread_safe():
+    try:
+        model = backends.load(pipeline.MODEL_PATH, "tflite")
+    except ImportError:
+        pytest.skip("no TFLite interpreter installed")
+    errors = []
+
+    def run(rows):
+        X = np.random.default_rng(rows).normal(size=(rows, model.input_dim)).astype(np.float32)
+        expected = model.predict(X)
+        for _ in range(200):
+            try:
+                np.testing.assert_array_equal(model.predict(X), expected)
+            except Exception as exc:
+                errors.append(exc)
+
+    # Different batch sizes make every call resize the shared interpreter
+    threads = [threading.Thread(target=run, args=(rows,)) for rows in (1, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
@@ -0,0 +1,39 @@
+import threading
+
+import numpy as np
+import pytest
+
+from churn_serving import batching
+
+
+def test_cancelled_caller_does_not_stop_the_batcher():
+    release = threading.Event()
+
+    def predict(X):
+        release.wait(5)
+        return X.sum(axis=1)
+
+    batcher = batching.MicroBatcher(predict, max_wait_ms=0)
+    busy = batcher.submit([[1.0, 2.0]])
+    # Queued behind the running batch, then abandoned by its caller
+    cancelled = batcher.submit([[3.0, 4.0]])
+    assert cancelled.cancel()
+    release.set()
+    np.testing.assert_array_equal(busy.result(5), [3.0])
+    np.testing.assert_array_equal(batcher.predict([[5.0, 6.0], [7.0, 8.0]], timeout=5), [11.0, 15.0])
+    assert batcher.metrics()["rows"] == 3
+
+
+def test_failing_predict_fn_fails_its_batch_only():
+    calls = []
+
+    def predict(X):
+        calls.append(len(X))
+        if len(calls) == 1:
+            raise RuntimeError("model failed")
+        return X[:, 0]
+
+    batcher = batching.MicroBatcher(predict, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.predict([[1.0]], timeout=5)
+    np.testing.assert_array_equal(batcher.predict([[2.0]], timeout=5), [2.0])
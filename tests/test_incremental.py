@@ -0,0 +1,76 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn_serving import backends, incremental, models, pipeline
+
+SCORING_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "scoring_web.csv")
+
+
+@pytest.mark.parametrize("values", [
+    [50001, 50002],
+    [50001.0, 50002.0],
+    ["50001", "50002"],
+    pd.Categorical(["50001", "50002"]),
+])
+def test_customer_ids(values):
+    np.testing.assert_array_equal(incremental.customer_ids(values, "CustomerID"), [50001, 50002])
+
+
+@pytest.mark.parametrize("values", [[50001.0, np.nan], [50001.0, 50002.5], ["50001", "x"]])
+def test_invalid_customer_ids_are_rejected(values):
+    with pytest.raises(ValueError, match="first at data row 11"):
+        incremental.customer_ids(values, "CustomerID", first_row=9)
+
+
+def test_second_run_rescores_only_new_and_changed_rows(tmp_path):
+    spec = models.get_spec("deploy")
+    model_path = shutil.copy(backends.artifact_path(spec.model_path, "numpy"), tmp_path)
+    scaler_path = shutil.copy(spec.scaler_path, tmp_path)
+    shutil.copy(os.path.splitext(spec.scaler_path)[0] + ".json", tmp_path)
+    state_path = tmp_path / "state.npz"
+    model, scaler = pipeline.load_model_and_scaler(model_path, scaler_path)
+    first = pd.read_csv(SCORING_CSV).head(40)
+
+    def run(df, name):
+        df.to_csv(tmp_path / f"{name}.csv", index=False)
+        stats = incremental.score_incremental(
+            tmp_path / f"{name}.csv", tmp_path / f"{name}_scored.csv", state_path,
+            model_path, scaler_path, id_col="CustomerID", chunk_rows=16,
+        )
+        return stats, pd.read_csv(tmp_path / f"{name}_scored.csv")["Churn_Probability"]
+
+    stats, _ = run(first, "first")
+    assert (stats["full"], stats["new"], stats["carried"], stats["dropped"]) == (True, 40, 0, 0)
+
+    # Mark the stored scores, so carried-forward rows can be told from re-scored ones
+    key = incremental.state_key(model_path, scaler_path, "numpy",
+                                pipeline.input_columns(scaler, first.columns))
+    ids, hashes, probs = incremental.load_state(state_path, key)
+    assert len(ids) == 40
+    incremental.save_state(state_path, key, ids, hashes, np.full_like(probs, 0.25))
+
+    second = first.iloc[3:].copy()
+    second.loc[[3, 4], "Tenure"] += 1
+    added = first.iloc[5:8].copy()
+    added["CustomerID"] += 100_000
+    second = pd.concat([second, added], ignore_index=True)
+    fresh = pipeline.score_frame(model, scaler, second.copy())["Churn_Probability"].to_numpy()
+
+    stats, scored = run(second, "second")
+    assert (stats["full"], stats["rows"], stats["new"], stats["changed"], stats["carried"],
+            stats["dropped"]) == (False, 40, 3, 2, 35, 3)
+    rescored = np.zeros(len(second), dtype=bool)
+    rescored[[0, 1, 37, 38, 39]] = True
+    np.testing.assert_array_equal(scored[~rescored], 0.25)
+    np.testing.assert_allclose(scored[rescored], fresh[rescored], atol=1e-6)
+
+    # A changed model artifact invalidates the state
+    st = os.stat(model_path)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    stats, scored = run(second, "third")
+    assert (stats["full"], stats["new"], stats["carried"], stats["dropped"]) == (True, 40, 0, 0)
+    np.testing.assert_allclose(scored, fresh, atol=1e-6)
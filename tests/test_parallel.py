@@ -0,0 +1,53 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn_serving import backends, models, parallel, pipeline
+
+SCORING_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "scoring_web.csv")
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1_000, 100_000])
+def test_csv_blocks_are_whole_lines(chunk_rows):
+    with open(SCORING_CSV, "rb") as f:
+        data = f.read()
+    header, blocks = parallel.csv_blocks(io.BytesIO(data), chunk_rows)
+    blocks = list(blocks)
+    assert header + b"".join(blocks) == data
+    assert all(block.endswith(b"\n") for block in blocks[:-1])
+    if chunk_rows < 1_000:
+        assert len(blocks) > 1
+
+
+def test_pool_engine(monkeypatch):
+    spec = models.get_spec("deploy")
+    monkeypatch.delenv(backends.ENGINE_ENV, raising=False)
+    assert parallel.pool_engine(spec.model_path) == parallel.POOL_ENGINE
+    assert parallel.pool_engine(spec.model_path, "keras") == "keras"
+    monkeypatch.setenv(backends.ENGINE_ENV, "onnx")
+    assert parallel.pool_engine(spec.model_path) == "onnx"
+
+
+# numpy shares its weights with the workers; onnx is loaded by each worker
+@pytest.mark.parametrize("engine", ["numpy", "onnx"])
+def test_pool_matches_in_process_scoring(tmp_path, engine):
+    if engine == "onnx":
+        pytest.importorskip("onnxruntime")
+    spec = models.get_spec("deploy")
+    model, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, engine)
+    expected = pipeline.score_csv_in_chunks(model, scaler, SCORING_CSV, tmp_path / "a.csv",
+                                            chunk_rows=1_000)
+    with parallel.ParallelScorer.for_model(spec.model_path, spec.scaler_path, engine, 2) as scorer:
+        with open(SCORING_CSV, "rb") as f:
+            result = pipeline.score_csv_in_chunks(scorer, scorer.scaler, f, tmp_path / "b.csv",
+                                                  chunk_rows=1_000)
+    # Blocks are not cut at the same rows as in-process chunks, which can
+    # change the last bits of a probability
+    assert result[0] == expected[0]
+    assert result[4:] == expected[4:]
+    np.testing.assert_allclose(result[3], expected[3], atol=1e-6)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "b.csv"), pd.read_csv(tmp_path / "a.csv"),
+                                  atol=1e-6)
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn_serving import models, pipeline
+
+SCORING_CSV = os.path.join(models.ROOT_DIR, "ai-retention-radar", "sample_data", "scoring_web.csv")
+
+
+@pytest.mark.parametrize("engine", ["numpy", "numpy-sparse"])
+def test_unknown_categorical_values_are_counted(engine):
+    spec = models.get_spec("deploy")
+    model, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, engine)
+    raw = pd.read_csv(SCORING_CSV).head(200)
+
+    unknown = {}
+    expected = pipeline.score_frame(model, scaler, raw.copy(), unknown=unknown)
+    assert unknown == {}
+
+    df = raw.copy()
+    df.loc[:2, "PreferredPaymentMode"] = "Bitcoin"
+    df["Gender"] = df["Gender"].astype(object)
+    df.loc[3:4, "Gender"] = 1
+    scored = pipeline.score_frame(model, scaler, df, unknown=unknown)
+    assert unknown == {"PreferredPaymentMode": 3, "Gender": 2}
+    # Unchanged rows score as before
+    np.testing.assert_allclose(scored["Churn_Probability"][5:], expected["Churn_Probability"][5:])
+
+
+def test_numeric_coded_categoricals_score_alike_on_every_engine():
+    spec = models.get_spec("deploy")
+    df = pd.read_csv(SCORING_CSV).head(200)
+    df["Gender"] = (df["Gender"] == "Male").astype(np.int64)
+    results = {}
+    for engine in ("numpy", "numpy-sparse"):
+        model, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, engine)
+        unknown = {}
+        probs = pipeline.score_frame(model, scaler, df.copy(), unknown=unknown)["Churn_Probability"]
+        results[engine] = probs.to_numpy(), unknown
+    assert results["numpy"][1] == results["numpy-sparse"][1] == {"Gender": len(df)}
+    np.testing.assert_allclose(results["numpy"][0], results["numpy-sparse"][0], atol=1e-5)
+
+
+@pytest.mark.parametrize("collide", [False, True])
+def test_predict_unique_matches_predict_proba_on_every_row(monkeypatch, collide):
+    spec = models.get_spec("deploy")
+    model, scaler = pipeline.load_model_and_scaler(spec.model_path, spec.scaler_path, "numpy")
+    X = pipeline.scale(scaler, pd.read_csv(SCORING_CSV).head(50))
+    pipeline.impute(X, pipeline.scaled_fill_values(scaler))
+    distinct = len(np.unique(X, axis=0))
+    X = X[np.random.default_rng(0).integers(0, 50, 400)]
+    if collide:
+        # Every row hashes alike, so unique_rows must fall back to np.unique
+        monkeypatch.setattr(pipeline.pd, "factorize",
+                            lambda h: (np.zeros(len(h), dtype=np.intp), h[:1]))
+
+    first, inverse = pipeline.unique_rows(X)
+    np.testing.assert_array_equal(X[first][inverse], X)
+    assert len(first) == len(np.unique(X, axis=0)) <= distinct
+
+    dedup = {}
+    probs = pipeline.predict_unique(model, X, dedup)
+    assert dedup == {"rows": 400, "scored": len(first)}
+    np.testing.assert_allclose(probs, pipeline.predict_proba(model, X), atol=1e-6)